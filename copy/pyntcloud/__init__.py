@@ -1 +1,2 @@
 from .core_class import PyntCloud
+from .columnar import ColumnarCloud
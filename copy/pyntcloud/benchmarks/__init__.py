@@ -0,0 +1,5 @@
+"""Benchmark scripts, run as ``python -m pyntcloud.benchmarks.<name>``.
+
+Each script times the current implementation against an inline copy of
+the code it replaced, on synthetic data.
+"""
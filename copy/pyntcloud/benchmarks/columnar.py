@@ -0,0 +1,60 @@
+"""PyntCloud against ColumnarCloud: construction and chained filters.
+
+    python -m pyntcloud.benchmarks.columnar [--n 10000000]
+"""
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from .. import ColumnarCloud, PyntCloud
+from .common import report, timeit
+
+
+def make_columns(n):
+    rng = np.random.default_rng(0)
+    columns = {name: rng.random(n, dtype=np.float32) * 100 for name in ["x", "y", "z"]}
+    for name in ["red", "green", "blue"]:
+        columns[name] = rng.integers(0, 256, n, dtype=np.uint8)
+    columns["intensity"] = rng.integers(0, 65536, n, dtype=np.uint16)
+    return columns
+
+
+def chained_filters(cloud):
+    """Three BBOX filters, each applied before the next is computed."""
+    for low in [5, 10, 15]:
+        cloud.get_filter("BBOX", min_x=low, max_x=100 - low, min_y=low, max_y=100 - low,
+                         min_z=low, max_z=100 - low, and_apply=True)
+    return len(cloud.xyz)
+
+
+def peak_memory(fn, *args):
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def main(n):
+    columns = make_columns(n)
+    before, _ = timeit(lambda: PyntCloud(pd.DataFrame(columns)))
+    after, _ = timeit(lambda: ColumnarCloud(columns))
+    report("build from arrays", before, after)
+
+    before, left = timeit(lambda: chained_filters(PyntCloud(pd.DataFrame(columns))), repeat=1)
+    after, columnar_left = timeit(lambda: chained_filters(ColumnarCloud(columns)), repeat=1)
+    report("3 chained BBOX filters", before, after)
+    assert left == columnar_left
+    print("  {} of {} points left".format(left, n))
+
+    print("  peak extra memory: PyntCloud {:.0f} MB, ColumnarCloud {:.0f} MB".format(
+        peak_memory(lambda: chained_filters(PyntCloud(pd.DataFrame(columns)))),
+        peak_memory(lambda: chained_filters(ColumnarCloud(columns)))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=10000000)
+    main(parser.parse_args().n)
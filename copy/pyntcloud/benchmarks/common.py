@@ -0,0 +1,15 @@
+import time
+
+
+def timeit(fn, *args, repeat=3, **kwargs):
+    """Best wall time of repeat calls, and the result of the last one."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(name, before, after):
+    print("{:<28} {:>8.3f}s -> {:>8.3f}s  (x{:.1f})".format(name, before, after, before / after))
@@ -0,0 +1,71 @@
+"""Covariances and eigen solvers of the k-neighbors scalar fields.
+
+    python -m pyntcloud.benchmarks.k_neighbors [--n 200000] [--k 16]
+"""
+import argparse
+
+import numpy as np
+
+from ..utils.array import cov3D, eigh3D, eigvalsh3D
+from .common import report, timeit
+
+
+def cov3D_einsum(k_neighbors):
+    """cov3D before the batched matmul."""
+    diffs = k_neighbors - k_neighbors.mean(1, keepdims=True)
+    return np.einsum('ijk,ijl->ikl', diffs, diffs) / k_neighbors.shape[1]
+
+
+def eigvals_sorted(cov):
+    """EigenValues before eigvalsh: general solver and argsort."""
+    eigenvalues = np.linalg.eigvals(cov)
+    return np.take_along_axis(eigenvalues, eigenvalues.argsort(), 1)
+
+
+def eig_sorted(cov):
+    """EigenDecomposition before eigh."""
+    eigenvalues, eigenvectors = np.linalg.eig(cov)
+    sort = eigenvalues.argsort()
+    return np.take_along_axis(eigenvalues, sort, 1), np.take_along_axis(eigenvectors, sort[:, None, :], 2)
+
+
+def svd_normals(k_neighbors):
+    """UnorientedNormals before eigh."""
+    diffs = k_neighbors - k_neighbors.mean(1, keepdims=True)
+    return np.linalg.svd(diffs)[2][:, 2]
+
+
+def main(n, k):
+    rng = np.random.default_rng(0)
+    xyz = rng.random((n, 3))
+    neighbors = rng.integers(0, n, (n, k))
+    for dtype in ["float64", "float32"]:
+        print(dtype)
+        k_neighbors = xyz.astype(dtype)[neighbors]
+        before, _ = timeit(cov3D_einsum, k_neighbors)
+        after, cov = timeit(cov3D, k_neighbors)
+        report("cov3D einsum -> matmul", before, after)
+
+        before, reference = timeit(eigvals_sorted, cov)
+        after, eigenvalues = timeit(eigvalsh3D, cov)
+        report("eigvals+sort -> eigvalsh", before, after)
+        print("  max difference {:.2e}".format(np.abs(reference - eigenvalues).max()))
+        after, eigenvalues = timeit(eigvalsh3D, cov, method="analytic")
+        report("eigvals -> analytic", before, after)
+        print("  max difference {:.2e}".format(np.abs(reference - eigenvalues).max()))
+
+        before, _ = timeit(eig_sorted, cov)
+        after, _ = timeit(eigh3D, cov)
+        report("eig -> eigh", before, after)
+
+        before, _ = timeit(svd_normals, k_neighbors)
+        after, _ = timeit(lambda: eigh3D(cov3D(k_neighbors))[1][:, :, 0])
+        report("svd -> eigh (normals)", before, after)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=200000)
+    parser.add_argument("--k", type=int, default=16)
+    args = parser.parse_args()
+    main(args.n, args.k)
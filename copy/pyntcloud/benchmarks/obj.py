@@ -0,0 +1,62 @@
+"""OBJ reading: line by line against blocks parsed with NumPy.
+
+    python -m pyntcloud.benchmarks.obj [--n 3000000]
+"""
+import argparse
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from ..io.obj import read_obj
+from .common import report, timeit
+
+
+def read_obj_before(filename):
+    """read_obj before the blocks, v and f lines only.
+
+    The mesh cast is patched (dtype given after the DataFrame is built),
+    the original fails on pandas 2.
+    """
+    v = []
+    f = []
+    with open(filename) as obj:
+        for line in obj:
+            if line.startswith('v '):
+                v.append(line.strip()[1:].split())
+            elif line.startswith('f'):
+                f.append(line.strip()[1:].lstrip())
+
+    points = pd.DataFrame(v, columns=["x", "y", "z", "w"][:len(v[0])]).astype('f4')
+    mesh_columns = ["v{}".format(i + 1) for i in range(sum(c.isdigit() for c in f[0].split(" ")))]
+    mesh = pd.DataFrame([re.split(r'\D+', x) for x in f], columns=mesh_columns).astype('i4')
+    mesh -= 1
+    return {"points": points, "mesh": mesh}
+
+
+def write_test_obj(filename, n):
+    rng = np.random.default_rng(0)
+    xyz = rng.random((n, 3), dtype=np.float32) * 100
+    faces = rng.integers(1, n + 1, (2 * n, 3))
+    with open(filename, "w") as obj:
+        np.savetxt(obj, xyz, fmt="v %.6f %.6f %.6f")
+        np.savetxt(obj, faces, fmt="f %d %d %d")
+
+
+def main(n):
+    filename = os.path.join(tempfile.mkdtemp(), "bench.obj")
+    write_test_obj(filename, n)
+    print("{} vertices, {} faces".format(n, 2 * n))
+    before, reference = timeit(read_obj_before, filename, repeat=1)
+    after, data = timeit(read_obj, filename, repeat=1)
+    report("read", before, after)
+    assert np.array_equal(reference["points"].values, data["points"][["x", "y", "z"]].values)
+    assert np.array_equal(reference["mesh"].values, data["mesh"].values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=3000000)
+    main(parser.parse_args().n)
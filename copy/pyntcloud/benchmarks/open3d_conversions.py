@@ -0,0 +1,55 @@
+"""PyntCloud <-> Open3D conversions.
+
+    python -m pyntcloud.benchmarks.open3d_conversions [--n 2000000]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from .. import PyntCloud
+from .common import report, timeit
+
+
+def to_open3d_before(cloud):
+    """to_open3d before the float64 buffers, with the /255 callers applied afterwards."""
+    import open3d as o3d
+    point_cloud = o3d.geometry.PointCloud()
+    point_cloud.points = o3d.utility.Vector3dVector(cloud.xyz)
+    point_cloud.colors = o3d.utility.Vector3dVector(cloud.points[['red', 'green', 'blue']].values)
+    point_cloud.colors = o3d.utility.Vector3dVector(np.asarray(point_cloud.colors) / 255)
+    return point_cloud
+
+
+def from_open3d_before(point_cloud):
+    """from_open3d before the single pass color cast."""
+    points = pd.DataFrame(data=np.asarray(point_cloud.points), columns=["x", "y", "z"])
+    colors = (np.asarray(point_cloud.colors) * 255).astype(np.uint8)
+    points["red"] = colors[:, 0]
+    points["green"] = colors[:, 1]
+    points["blue"] = colors[:, 2]
+    return points
+
+
+def main(n):
+    rng = np.random.default_rng(0)
+    points = pd.DataFrame(rng.random((n, 3), dtype=np.float32) * 100, columns=["x", "y", "z"])
+    for name in ["red", "green", "blue"]:
+        points[name] = rng.integers(0, 256, n, dtype=np.uint8)
+    cloud = PyntCloud(points)
+
+    before, reference = timeit(to_open3d_before, cloud, repeat=1)
+    after, point_cloud = timeit(cloud.to_instance, "open3d", mesh=False, normalize_colors=True)
+    report("to_open3d", before, after)
+    assert np.allclose(np.asarray(reference.colors), np.asarray(point_cloud.colors))
+
+    before, _ = timeit(from_open3d_before, point_cloud)
+    after, converted = timeit(PyntCloud.from_instance, "open3d", point_cloud)
+    report("from_open3d", before, after)
+    assert np.array_equal(converted.points["red"].values, points["red"].values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=2000000)
+    main(parser.parse_args().n)
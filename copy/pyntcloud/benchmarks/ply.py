@@ -0,0 +1,101 @@
+"""PLY reading and writing, ASCII and binary.
+
+    python -m pyntcloud.benchmarks.ply [--n-ascii 1000000] [--n-binary 10000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from ..io.ply import read_ply, write_ply
+from .common import report, timeit
+
+
+def make_points(n):
+    rng = np.random.default_rng(0)
+    points = pd.DataFrame(rng.random((n, 3), dtype=np.float32) * 100, columns=["x", "y", "z"])
+    for name in ["red", "green", "blue"]:
+        points[name] = rng.integers(0, 256, n, dtype=np.uint8)
+    points["gps_time"] = rng.random(n) * 1e6
+    return points
+
+
+def make_mesh(n_points, n_faces=1000):
+    rng = np.random.default_rng(1)
+    return pd.DataFrame(rng.integers(0, n_points, (n_faces, 3), dtype=np.int32), columns=["v1", "v2", "v3"])
+
+
+def header_end(filename):
+    """Number of header lines and byte offset of the data."""
+    with open(filename, "rb") as ply:
+        n_lines = 0
+        while True:
+            n_lines += 1
+            if ply.readline().startswith(b"end_header"):
+                return n_lines, ply.tell()
+
+
+def read_ascii_before(filename, points, mesh):
+    """ASCII vertices before the C engine: python engine, skipfooter and astype."""
+    top, _ = header_end(filename)
+    names = list(points.columns)
+    data = pd.read_csv(filename, sep=" ", header=None, engine="python",
+                       skiprows=top, skipfooter=len(mesh), usecols=names, names=names)
+    for name in names:
+        data[name] = data[name].astype(points[name].dtype)
+    return data
+
+
+def read_binary_before(filename, points, mesh):
+    """Binary vertices before the memory map: np.fromfile and a DataFrame of the records."""
+    _, offset = header_end(filename)
+    dtype = [(name, "<" + points[name].dtype.str[1:]) for name in points.columns]
+    with open(filename, "rb") as ply:
+        ply.seek(offset)
+        records = np.fromfile(ply, dtype=dtype, count=len(points))
+    return pd.DataFrame(records)
+
+
+def write_binary_before(filename, points, mesh):
+    """Binary write before the chunks: the whole DataFrame through to_records."""
+    write_ply(filename, points=points.iloc[:0], mesh=None)
+    with open(filename, "ab") as ply:
+        points.to_records(index=False).tofile(ply)
+
+
+def main(n_ascii, n_binary):
+    directory = tempfile.mkdtemp()
+    for n, as_text in [(n_binary, False), (n_ascii, True)]:
+        points = make_points(n)
+        mesh = make_mesh(n)
+        filename = os.path.join(directory, "bench.ply")
+        kind = "ascii" if as_text else "binary"
+        print("{} {} vertices, {} faces".format(kind, n, len(mesh)))
+        write_ply(filename, points=points, mesh=mesh, as_text=as_text)
+
+        before_read = read_ascii_before if as_text else read_binary_before
+        before, reference = timeit(before_read, filename, points, mesh, repeat=1)
+        after, data = timeit(read_ply, filename, repeat=1)
+        report("read", before, after)
+        wrong = 0
+        for name in points.columns:
+            assert np.array_equal(data["points"][name].values, points[name].values), name
+            wrong += int((reference[name].values != points[name].values).sum())
+        print("  values not read back exactly before: {}".format(wrong))
+
+        if not as_text:
+            before, _ = timeit(write_binary_before, os.path.join(directory, "before.ply"), points, mesh)
+            after, _ = timeit(write_ply, filename, points=points)
+            report("write", before, after)
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-ascii", type=int, default=1000000)
+    parser.add_argument("--n-binary", type=int, default=10000000)
+    args = parser.parse_args()
+    main(args.n_ascii, args.n_binary)
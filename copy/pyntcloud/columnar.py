@@ -0,0 +1,307 @@
+import numpy as np
+import pandas as pd
+
+from .filters import ALL_FILTERS
+from .neighbors import k_neighbors, r_neighbors
+from .samplers import ALL_SAMPLERS
+from .scalar_fields import ALL_SF
+from .structures import ALL_STRUCTURES
+from .structures.base import StructuresDict
+
+COLOR_COLUMNS = ["red", "green", "blue"]
+
+
+def to_uint8_colors(name, column):
+    """uint8 copy of an integer color column, decided by its dtype, not its values.
+
+    uint16 colors are 16 bit, as in LAS files, and are scaled down by 256.
+    Other integer dtypes must already hold 8 bit values.
+    """
+    if column.dtype == np.uint8:
+        return column
+    if column.dtype == np.uint16:
+        return (column // 256).astype(np.uint8)
+    if len(column) and (column.min() < 0 or column.max() > 255):
+        raise ValueError("{} values must be in [0, 255] or stored as uint16".format(name))
+    return column.astype(np.uint8)
+
+
+class ColumnarPoints(object):
+    """Table-like view over a dict of 1D arrays.
+
+    Implements the part of the DataFrame API used by filters, samplers,
+    scalar fields and structures. Columns are shared with the owning
+    ColumnarCloud; if index is not None only those rows are visible.
+    """
+
+    def __init__(self, columns, index=None):
+        self._columns = columns
+        self._index = index
+
+    def __len__(self):
+        if self._index is not None:
+            return len(self._index)
+        return len(next(iter(self._columns.values())))
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            column = self._columns[key]
+            return column if self._index is None else column[self._index]
+        return ColumnarPoints({name: self._columns[name] for name in key}, self._index)
+
+    def __setitem__(self, name, values):
+        if self._index is not None:
+            raise ValueError("Can't add columns to a filtered view; call compact() first")
+        values = np.asarray(values)
+        if len(values) != len(self):
+            raise ValueError("Column length must match the number of points")
+        self._columns[name] = values
+
+    @property
+    def values(self):
+        return np.column_stack([self[name] for name in self._columns])
+
+    def to_numpy(self):
+        return self.values
+
+    def to_pandas(self):
+        return pd.DataFrame({name: self[name] for name in self._columns})
+
+
+class ColumnarCloud(object):
+    """A point cloud stored as contiguous NumPy columns.
+
+    x, y and z are contiguous float32 columns of a single Fortran-ordered
+    (N, 3) array, so xyz needs no copy. They are stored relative to
+    self.offset, so large absolute coordinates keep their precision in
+    float32 (see PyntCloud.offset). Integer colors are always stored as
+    uint8, see to_uint8_colors. Filtering only composes an index over the shared columns; the
+    rows are gathered when a column is read.
+    """
+
+    # see PyntCloud.offset
+    offset = None
+
+    def __init__(self, points, mesh=None, structures=None, offset="auto", **kwargs):
+        """Create ColumnarCloud.
+
+        Parameters
+        ----------
+        points: dict of 1D array-like or pd.DataFrame
+            Must contain x, y and z.
+
+        offset: "auto", None or (3,) array-like, optional
+            Default: "auto"
+            "auto": x, y and z are absolute; the floor of their minimum is
+            subtracted in float64 before the float32 cast and kept as
+            self.offset.
+            None: x, y and z are stored as given.
+            array: x, y and z are already relative to this origin.
+
+        mesh: pd.DataFrame or None, optional
+            Default: None
+
+        structures: dict, optional
+            Map key(base.Structure.id) to val(base.Structure)
+
+        kwargs: custom attributes
+        """
+        if not set(["x", "y", "z"]).issubset(points.keys()):
+            raise ValueError("Points must have x, y and z coordinates")
+        xyz = np.empty((len(points["x"]), 3), dtype=np.float32, order="F")
+        columns = {}
+        origin = np.zeros(3)
+        for i, name in enumerate(["x", "y", "z"]):
+            values = np.asarray(points[name])
+            if isinstance(offset, str) and offset == "auto" and len(values):
+                origin[i] = np.floor(values.min())
+                np.subtract(values, origin[i], out=xyz[:, i], casting="unsafe")
+            else:
+                xyz[:, i] = values
+            columns[name] = xyz[:, i]
+        if isinstance(offset, str):
+            if offset != "auto":
+                raise ValueError("offset must be 'auto', None or an array")
+            offset = origin
+        self.offset = None if offset is None else np.asarray(offset, dtype=np.float64)
+        for name in points.keys():
+            if name in columns:
+                continue
+            column = np.ascontiguousarray(points[name])
+            if name in COLOR_COLUMNS and np.issubdtype(column.dtype, np.integer):
+                column = to_uint8_colors(name, column)
+            columns[name] = column
+
+        self._set_storage(columns, xyz, None)
+        self.mesh = mesh
+        # see PyntCloud.fitted_models
+        self.fitted_models = {}
+        self.structures = StructuresDict()
+        for key, val in (structures or {}).items():
+            self.structures[key] = val
+        for key, val in kwargs.items():
+            setattr(self, key, val)
+
+    def _set_storage(self, columns, xyz, index):
+        self._columns = columns
+        self._xyz = xyz
+        self._index = index
+        self._xyz_view = None
+        self._centroid = None
+
+    @classmethod
+    def from_pyntcloud(cls, cloud):
+        # a cloud without offset has absolute coordinates
+        return cls(cloud.points, mesh=cloud.mesh, offset="auto" if cloud.offset is None else cloud.offset)
+
+    def to_pyntcloud(self):
+        from .core_class import PyntCloud
+        return PyntCloud(self.points.to_pandas(), mesh=self.mesh, offset=self.offset)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __repr__(self):
+        return "ColumnarCloud({} points, columns={})".format(len(self), self.points.columns)
+
+    @property
+    def points(self):
+        return ColumnarPoints(self._columns, self._index)
+
+    @property
+    def xyz(self):
+        if self._xyz_view is None:
+            self._xyz_view = self._xyz if self._index is None else self._take_xyz()
+        return self._xyz_view
+
+    def _take_xyz(self):
+        xyz = np.empty((len(self._index), 3), dtype=self._xyz.dtype, order="F")
+        for i in range(3):
+            np.take(self._xyz[:, i], self._index, out=xyz[:, i])
+        return xyz
+
+    @property
+    def centroid(self):
+        if self._centroid is None:
+            self._centroid = self.xyz.mean(0)
+        return self._centroid
+
+    def take(self, indices):
+        """New cloud with the given rows, sharing the columns of this one."""
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        if self._index is not None:
+            indices = self._index[indices]
+        cloud = self.__class__.__new__(self.__class__)
+        cloud._set_storage(dict(self._columns), self._xyz, indices)
+        cloud.mesh = None
+        cloud.fitted_models = {}
+        cloud.structures = StructuresDict()
+        cloud.offset = self.offset
+        return cloud
+
+    def compact(self):
+        """Gather the visible rows into new contiguous columns."""
+        if self._index is None:
+            return
+        xyz = self._take_xyz()
+        columns = {name: xyz[:, i] for i, name in enumerate(["x", "y", "z"])}
+        for name, column in self._columns.items():
+            if name not in columns:
+                columns[name] = column[self._index]
+        self._set_storage(columns, xyz, None)
+
+    def apply_filter(self, boolean_array):
+        """Keep only the points where boolean_array is True. No rows are copied."""
+        filtered = self.take(boolean_array)
+        self._set_storage(filtered._columns, self._xyz, filtered._index)
+        self.structures = StructuresDict()
+
+    def add_structure(self, name, **kwargs):
+        """See PyntCloud.add_structure."""
+        if name in ALL_STRUCTURES:
+            info = ALL_STRUCTURES[name].extract_info(pyntcloud=self)
+            structure = ALL_STRUCTURES[name](**info, **kwargs)
+            structure.compute()
+            structure_added = structure.get_and_set(self)
+
+        else:
+            raise ValueError("Unsupported structure. Check docstring")
+
+        return structure_added
+
+    def get_neighbors(self, k=None, r=None, kdtree=None):
+        """See PyntCloud.get_neighbors. Indices are positions in self.xyz."""
+        if kdtree is None:
+            kdtree_id = self.add_structure("kdtree")
+            kdtree = self.structures[kdtree_id]
+        else:
+            kdtree = self.structures[kdtree]
+
+        if k is not None:
+            return k_neighbors(kdtree, k)
+
+        elif r is not None:
+            return r_neighbors(kdtree, r)
+
+        else:
+            raise ValueError("You must supply 'k' or 'r' values.")
+
+    def add_scalar_field(self, name, **kwargs):
+        """See PyntCloud.add_scalar_field. A filtered cloud is compacted first."""
+        if name in ALL_SF:
+            self.compact()
+            scalar_field = ALL_SF[name](pyntcloud=self, **kwargs)
+            scalar_field.extract_info()
+            scalar_field.compute()
+            scalar_fields_added = scalar_field.get_and_set()
+
+        else:
+            raise ValueError("Unsupported scalar field. Check docstring")
+
+        return scalar_fields_added
+
+    def get_filter(self, name, and_apply=False, **kwargs):
+        """See PyntCloud.get_filter."""
+        if name in ALL_FILTERS:
+            pointcloud_filter = ALL_FILTERS[name](pyntcloud=self, **kwargs)
+            pointcloud_filter.extract_info()
+            boolean_array = pointcloud_filter.compute()
+
+            if and_apply:
+                self.apply_filter(boolean_array)
+
+            return boolean_array
+
+        else:
+            raise ValueError("Unsupported filter. Check docstring")
+
+    def get_sample(self, name, **kwargs):
+        """See PyntCloud.get_sample.
+
+        Returns
+        -------
+        sample: ColumnarCloud
+            Sharing the columns of this cloud when the sampler selects
+            existing points.
+        """
+        if name in ALL_SAMPLERS:
+            sampler = ALL_SAMPLERS[name](pyntcloud=self, **kwargs)
+            sampler.extract_info()
+            if hasattr(sampler, "get_indices"):
+                return self.take(sampler.get_indices())
+            return self.__class__(sampler.compute(), offset=self.offset)
+
+        else:
+            raise ValueError("Unsupported sampling method. Check docstring")
@@ -15,13 +15,23 @@ from .plot.pyvista_backend import plot_with_pyvista
 from .samplers import ALL_SAMPLERS
 from .scalar_fields import ALL_SF
 from .structures import ALL_STRUCTURES
-from .utils.dataframe import convert_columns_dtype
+from .utils.dataframe import cast_float_columns
 from .io.las import read_las
 
 
 class PyntCloud(object):
     """A Pythonic Point Cloud."""
 
+    # dtype of the float columns written by to_file; None keeps each
+    # column's own dtype. Can be overridden per instance, i.e.
+    # PyntCloud(points, precision=None)
+    precision = "float32"
+
+    # (3,) float64 origin of the coordinate frame: x, y, z are relative to
+    # it so they keep their precision in float32. Set by read_las, kept by
+    # samples and splits, and added back by to_file.
+    offset = None
+
     def __init__(self, points, mesh=None, structures=None, **kwargs):
         """Create PyntCloud.
 
@@ -43,23 +53,24 @@ class PyntCloud(object):
         """
         self.points = points
         self.mesh = mesh
+        # models fitted by scalar fields such as sequential_fit, by column name
+        self.fitted_models = {}
         self.structures = StructuresDict()
         structures = structures or {}
         for key, val in structures.items():
             self.structures[key] = val
         for key, val in kwargs.items():
             setattr(self, key, val)
-        # store raw xyz values to share memory along structures
-        self.xyz = self.points[["x", "y", "z"]].values
-        self.centroid = self.xyz.mean(0)
 
     def __repr__(self):
         default = [
             "_PyntCloud__points",
             "_PyntCloud__mesh",
             "structures",
-            "xyz",
-            "centroid"
+            "fitted_models",
+            "_filter_index",
+            "_xyz",
+            "_centroid"
         ]
         others = ["\n\t {}: {}".format(x, str(type(getattr(self, x))))
                   for x in self.__dict__ if x not in default]
@@ -79,8 +90,28 @@ class PyntCloud(object):
 
     @property
     def points(self):
+        if self._filter_index is not None:
+            # apply the pending filters with a single copy
+            self.__points = self.__points.iloc[self._filter_index].reset_index(drop=True)
+            self._filter_index = None
         return self.__points
 
+    @property
+    def xyz(self):
+        """(N, 3) ndarray. Shares memory with points when they are not filtered."""
+        if self._xyz is None:
+            xyz = self.__points[["x", "y", "z"]].values
+            if self._filter_index is not None:
+                xyz = xyz[self._filter_index]
+            self._xyz = xyz
+        return self._xyz
+
+    @property
+    def centroid(self):
+        if self._centroid is None:
+            self._centroid = self.xyz.mean(0)
+        return self._centroid
+
     @points.setter
     def points(self, df):
         if not isinstance(df, pd.DataFrame):
@@ -109,7 +140,7 @@ class PyntCloud(object):
 
     @classmethod
     def from_file_las(cls, filename, max, **kwargs):
-        a, b, c = read_las(filename, max)
+        a, b, c = read_las(filename, max, **kwargs)
         return cls(**a),b, c
 
     @classmethod
@@ -173,14 +204,21 @@ class PyntCloud(object):
             to be saved in addition to points. Usually also_save=["mesh"]
 
         kwargs: only usable in some formats
+
+        Float columns are written as self.precision, except x, y and z,
+        which are written as float64 when self.offset has to be added back.
+        If "offset" is in also_save, the format stores it and x, y and z
+        are written relative to it. The conversion is done on a new
+        DataFrame; self.points is left untouched.
         """
-        convert_columns_dtype(self.points, np.float64, np.float32)
         ext = filename.split(".")[-1].upper()
         if ext not in TO_FILE:
             raise ValueError(
                 "Unsupported file format; supported formats are: {}".format(list(TO_FILE)))
         kwargs["filename"] = filename
-        kwargs["points"] = self.points
+        kwargs["points"] = cast_float_columns(self.points, self.precision)
+        if also_save is None or "offset" not in also_save:
+            kwargs["points"] = self.get_absolute_points(kwargs["points"])
         if also_save is not None:
             for x in also_save:
                 kwargs[x] = getattr(self, x)
@@ -197,7 +235,6 @@ class PyntCloud(object):
 
         kwargs: only usable in some formats
         """
-        convert_columns_dtype(self.points, np.float64, np.float32)
         library = library.upper()
         if library not in TO_INSTANCE:
             raise ValueError(
@@ -255,10 +292,15 @@ class PyntCloud(object):
                     Returned from: self.get_neighbors(k, ...) /
                     manually querying some self.kdtrees[x] /
                     other methods.
+                dtype: numpy dtype, optional
+                    Default: None
+                    Precision of the covariances, i.e. "float32".
 
             eigen_decomposition
 
             eigen_values
+                method: {"eigh", "analytic"}, optional
+                    Default: "eigh"
 
         **REQUIRE NORMALS**
 
@@ -313,6 +355,30 @@ class PyntCloud(object):
                     Default: 100
                     Maximum number of fitting iterations.
 
+            sequential_fit
+                model: {"plane", "sphere"}, optional
+                    Default: "plane"
+                max_dist: float, optional
+                    Default: 1e-4
+                    Maximum distance from point to model in order to be considered as inlier.
+                max_models: int, optional
+                    Default: 50
+                min_inliers: int, optional
+                    Default: 100
+                radius: float, optional
+                    Default: None
+                    Search each model among the points within radius of a random seed.
+                cluster_size: float, optional
+                    Default: None
+                    Keep only the largest connected cluster of voxels of this size.
+                random_state: int, optional
+                    Default: None
+                    Seed for reproducible results.
+                name: str, optional
+                    Default: "{model}_id"
+                    Will be used to name the added column. The fitted models are
+                    stored in self.fitted_models[name].
+
             custom_fit
                 model: subclass of ransac.models.RansacModel
                     Model to be fitted
@@ -389,6 +455,9 @@ class PyntCloud(object):
                     Default: True
                     If True, the bounding box of the point cloud will be adjusted
                     in order to have all the dimensions of equal length.
+                sparse: bool, optional
+                    Default: False
+                    If True, only occupied voxels are stored.
 
             octree
                 TODO
@@ -540,7 +609,7 @@ class PyntCloud(object):
             sample = sampler.compute()
 
             if as_PyntCloud:
-                return PyntCloud(sample)
+                return PyntCloud(sample, offset=self.offset)
 
             return sample
 
@@ -623,12 +692,26 @@ class PyntCloud(object):
     def apply_filter(self, boolean_array):
         """Update self.points removing points where filter is False.
 
+        The filter is not applied right away: consecutive filters are
+        composed into one index, and self.points is copied once, the next
+        time it is accessed. self.xyz is computed without copying the other
+        columns. Structures and mesh are dropped, as when assigning points.
+
         Parameters
         ----------
         boolean_array: ndarray, dtype bool
             len(boolean array) must be equal to len(self.points)
         """
-        self.points = self.points.loc[boolean_array].reset_index(drop=True)
+        keep = np.flatnonzero(np.asarray(boolean_array))
+        xyz = self._xyz
+        index = keep if self._filter_index is None else self._filter_index[keep]
+        self._reset()
+        self._filter_index = index
+        if xyz is not None:
+            # column by column, which is much faster on Fortran ordered arrays
+            self._xyz = np.empty((len(keep), 3), dtype=xyz.dtype, order="F")
+            for i in range(3):
+                np.take(xyz[:, i], keep, out=self._xyz[:, i])
 
     def split_on(self, scalar_field, and_return=False, save_format="ply", save_path=os.getcwd()):
         """Divide the PyntCloud using unique values in given sf.
@@ -656,7 +739,8 @@ class PyntCloud(object):
         """
         scalar_field = self.points[scalar_field]
 
-        splits = {x: PyntCloud(self.points.loc[scalar_field == x]) for x in scalar_field.unique()}
+        splits = {x: PyntCloud(self.points.loc[scalar_field == x], offset=self.offset)
+                  for x in scalar_field.unique()}
 
         if not os.path.exists(save_path):
             os.makedirs(save_path)
@@ -667,13 +751,33 @@ class PyntCloud(object):
         if and_return:
             return splits
 
+    def get_absolute_points(self, points=None):
+        """Points with self.offset added back to x, y and z, as float64.
+
+        Parameters
+        ----------
+        points: pd.DataFrame, optional
+            Default: None, meaning self.points.
+        """
+        if points is None:
+            points = self.points
+        if self.offset is None or not np.any(self.offset):
+            return points
+        return points.assign(**{axis: points[axis].values.astype(np.float64) + self.offset[i]
+                                for i, axis in enumerate(["x", "y", "z"])})
+
     def _update_points(self, df):
         """Utility function. Implicitly called when self.points is assigned."""
+        self._reset()
+        self.__points = df
+
+    def _reset(self):
+        """Drop everything derived from the points."""
         self.mesh = None
         self.structures = StructuresDict()
-        self.__points = df
-        self.xyz = self.__points[["x", "y", "z"]].values
-        self.centroid = self.xyz.mean(0)
+        self._filter_index = None
+        self._xyz = None
+        self._centroid = None
 
     def plot(
             self,
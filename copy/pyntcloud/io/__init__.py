@@ -7,7 +7,8 @@ from .npz import read_npz, write_npz
 from .obj import read_obj, write_obj
 from .ply import read_ply, write_ply
 from .off import read_off
-from .pcd import read_pcd
+from .pcd import read_pcd, write_pcd
+from .pcol import read_pcol, write_pcol
 
 FROM_FILE = {
     "ASC": read_ascii,
@@ -19,6 +20,7 @@ FROM_FILE = {
     "OBJ": read_obj,
     "OFF": read_off,
     "PCD": read_pcd,
+    "PCOL": read_pcol,
     "PLY": read_ply,
     "PTS": read_ascii,
     "TXT": read_ascii,
@@ -35,6 +37,8 @@ TO_FILE = {
     "CSV": write_ascii,
     "NPZ": write_npz,
     "OBJ": write_obj,
+    "PCD": write_pcd,
+    "PCOL": write_pcol,
     "PLY": write_ply,
     "PTS": write_ascii,
     "TXT": write_ascii,
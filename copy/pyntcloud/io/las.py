@@ -6,8 +6,19 @@ try:
     import pylas
 except ImportError:
     pylas = None
+import struct
+from collections import namedtuple
+
+import numpy as np
 import pandas as pd
 
+# header fields needed to map the point records of an uncompressed .las file
+LasHeader = namedtuple("LasHeader", ["point_format", "offset_to_points", "record_length", "point_count",
+                                     "scales", "offsets", "mins", "maxs"])
+
+# byte offset of red, green, blue in the records of the point formats that have them
+LAS_RGB_OFFSETS = {2: 20, 3: 28, 5: 28, 7: 30, 8: 30, 10: 30}
+
 
 def convert_location_to_dtype(data, dtype_str):
     data["points"] = data["points"].astype({"x": dtype_str, "y": dtype_str, "z": dtype_str})
@@ -34,12 +45,16 @@ def convert_color_to_dtype(data, output_dtype):
         # Color information in las/laz files is stored as uint8 or uint16
         if input_dtype not in ["uint8", "uint16"]:
             raise ValueError(f"Invalid color dtype. Expected one of ['uint8', 'uint16'], but got {input_dtype}")
-        if input_dtype == "uint8" and output_dtype == "uint16":
-            data["points"].loc[:, column_names] *= 256
-        elif input_dtype == "uint16" and output_dtype == "uint8":
-            data["points"].loc[:, column_names] /= 256
-        data["points"] = data["points"].astype(
-            {"red": output_dtype, "green": output_dtype, "blue": output_dtype})
+        # scaled after the cast: uint8 * 256 overflows, uint16 / 256 is float
+        colors = {}
+        for name in column_names:
+            values = data["points"][name].values
+            if input_dtype == "uint8" and output_dtype == "uint16":
+                values = values.astype(output_dtype) * 256
+            elif input_dtype == "uint16" and output_dtype == "uint8":
+                values = (values // 256).astype(output_dtype)
+            colors[name] = values
+        data["points"] = data["points"].assign(**colors)
     return data
 
 
@@ -56,7 +71,36 @@ def read_las_with_laspy(filename):
     return data
 
 
-def read_las_with_pylas(filename, max):
+def get_las_offset(header, offset):
+    """Origin, in file coordinates, that the loaded xyz will be relative to.
+
+    Parameters
+    ----------
+    header: pylas header
+    offset: "header", "center", None or (3,) array-like
+        "header": the offset stored in the header.
+        "center": the center of the header bounding box, rounded to the
+        scale so the raw integers stay exact.
+        None: no offset, xyz are absolute.
+
+    Returns
+    -------
+    offset: (3,) ndarray of float64
+    """
+    if offset is None:
+        return np.zeros(3)
+    if isinstance(offset, str):
+        if offset == "header":
+            return np.asarray(header.offsets, dtype=np.float64)
+        if offset == "center":
+            scales = np.asarray(header.scales, dtype=np.float64)
+            center = (np.asarray(header.mins) + np.asarray(header.maxs)) / 2
+            return np.round(center / scales) * scales
+        raise ValueError("offset must be 'header', 'center', None or an array")
+    return np.asarray(offset, dtype=np.float64)
+
+
+def read_las_with_pylas(filename, max, offset="header", xyz_dtype="float32"):
     data = {}
     if pylas is None:
         raise ImportError("pylas is needed for reading .las files.")
@@ -65,13 +109,116 @@ def read_las_with_pylas(filename, max):
         las = las_file.read()
         data["points"] = pd.DataFrame(las.points)
         data["points"].columns = (x.lower() for x in data["points"].columns)
-        # because pylas do something strange with scale
-        data["points"].loc[:, ["x", "y", "z"]] *= las.header.scales
+        origin = get_las_offset(las.header, offset)
+        # x, y, z are the raw integers; scale them and shift to the chosen
+        # origin in float64 before any cast to xyz_dtype
+        shift = np.asarray(las.header.offsets, dtype=np.float64) - origin
+        for i, axis in enumerate(["x", "y", "z"]):
+            data["points"][axis] = (data["points"][axis].values * las.header.scales[i] + shift[i]).astype(xyz_dtype)
         data["las_header"] = las.header
+        data["offset"] = origin
     return data,las, len(las.points) <= max
 
 
-def read_las(filename, max, xyz_dtype="float32", rgb_dtype="uint8", backend="pylas"):
+def read_las_header(filename):
+    """ Read the public header block of a .las file, without pylas.
+
+    Returns
+    -------
+    header: LasHeader
+    """
+    with open(filename, "rb") as f:
+        block = f.read(255)
+    if len(block) < 227 or block[:4] != b"LASF":
+        raise ValueError("Not a .las file: {}".format(filename))
+    version_minor = block[25]
+    offset_to_points, = struct.unpack_from("<I", block, 96)
+    point_format = block[104]
+    record_length, point_count = struct.unpack_from("<HI", block, 105)
+    if version_minor >= 4 and len(block) >= 255:
+        # 64 bit count, the legacy one is 0 for formats 6 to 10
+        point_count, = struct.unpack_from("<Q", block, 247)
+    scales_offsets = np.frombuffer(block, dtype="<f8", count=6, offset=131)
+    bounds = np.frombuffer(block, dtype="<f8", count=6, offset=179)
+    return LasHeader(point_format, offset_to_points, record_length, point_count,
+                     scales_offsets[:3], scales_offsets[3:], bounds[1::2], bounds[::2])
+
+
+def get_las_record_dtype(header):
+    """ Structured dtype of the fields read from the point records. """
+    if header.point_format & 0xC0:
+        raise ValueError("Compressed point records can't be memory mapped; use the pylas backend")
+    names = ["x", "y", "z", "intensity"]
+    formats = ["<i4", "<i4", "<i4", "<u2"]
+    offsets = [0, 4, 8, 12]
+    if header.point_format in LAS_RGB_OFFSETS:
+        names += ["red", "green", "blue"]
+        formats += ["<u2"] * 3
+        offsets += [LAS_RGB_OFFSETS[header.point_format] + 2 * i for i in range(3)]
+    dtype = np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": header.record_length})
+    if offsets[-1] + 2 > header.record_length:
+        raise ValueError("Point records are too short for point format {}".format(header.point_format))
+    return dtype
+
+
+def decode_las_records(records, header, origin, xyz_dtype="float32"):
+    """ Columns of point records, with x, y and z scaled and relative to origin. """
+    shift = np.asarray(header.offsets, dtype=np.float64) - origin
+    columns = {}
+    for name in records.dtype.names:
+        columns[name] = np.ascontiguousarray(records[name])
+    for i, axis in enumerate(["x", "y", "z"]):
+        columns[axis] = (columns[axis] * header.scales[i] + shift[i]).astype(xyz_dtype)
+    return columns
+
+
+def read_las_with_memmap(filename, max, offset="header", xyz_dtype="float32", sample=None,
+                         chunk_size=1 << 20, on_chunk=None):
+    """ Read x, y, z, intensity and colors of an uncompressed .las file by memory mapping it.
+
+    Parameters
+    ----------
+    sample: int, optional
+        Default: None, all points.
+        Read about this many points, in 1024 runs spread evenly over the
+        file, touching only the pages of those runs.
+    chunk_size: int, optional
+        Points decoded at a time.
+    on_chunk: callable, optional
+        Called as on_chunk(done, total) after each chunk. An exception it
+        raises stops the read.
+    """
+    header = read_las_header(filename)
+    dtype = get_las_record_dtype(header)
+    origin = get_las_offset(header, offset)
+    count = header.point_count
+    columns = {name: np.empty(0, dtype=dtype.fields[name][0]) for name in dtype.names}
+    if count:
+        records = np.memmap(filename, dtype=dtype, mode="r", offset=header.offset_to_points, shape=(count,))
+        if sample is not None and sample < count:
+            n_runs = min(1024, sample)
+            run = sample // n_runs
+            starts = np.linspace(0, count - run, n_runs).astype(np.int64)
+            rows = np.unique((starts[:, None] + np.arange(run)).ravel())
+            columns = decode_las_records(records[rows], header, origin, xyz_dtype)
+        else:
+            columns = {name: np.empty(count, dtype=xyz_dtype if name in ("x", "y", "z") else dtype.fields[name][0])
+                       for name in dtype.names}
+            for start in range(0, count, chunk_size):
+                chunk = decode_las_records(records[start:start + chunk_size], header, origin, xyz_dtype)
+                for name, values in chunk.items():
+                    columns[name][start:start + chunk_size] = values
+                if on_chunk is not None:
+                    on_chunk(min(start + chunk_size, count), count)
+        del records
+    for name in ["x", "y", "z"]:
+        columns[name] = columns[name].astype(xyz_dtype, copy=False)
+    data = {"points": pd.DataFrame(columns, copy=False), "las_header": header, "offset": origin}
+    return data, None, count <= max
+
+
+def read_las(filename, max, xyz_dtype="float32", rgb_dtype="uint8", backend="pylas", offset="header",
+             **kwargs):
     """Read a .las/laz file and store elements in pandas DataFrame.
 
     Parameters
@@ -82,14 +229,27 @@ def read_las(filename, max, xyz_dtype="float32", rgb_dtype="uint8", backend="pyl
         Defines the data type of the xyz coordinate
     rgb_dtype: str
         Defines the data type of the color
+    offset: "header", "center", None or (3,) array-like
+        Default: "header"
+        Origin subtracted from the coordinates, so they stay precise in
+        float32. Stored in data["offset"]. See get_las_offset.
+    backend: "pylas" or "memmap"
+        Default: "pylas"
+        "memmap" maps the point records of uncompressed files instead of
+        reading them whole, and takes the sample, chunk_size and on_chunk
+        kwargs of read_las_with_memmap. It returns no pylas LasData.
     Returns
     -------
     data: dict
         Elements as pandas DataFrames.
     """
     if backend == "pylas":
-        data, las, is_valid = read_las_with_pylas(filename, max)
-        
+        data, las, is_valid = read_las_with_pylas(filename, max, offset, xyz_dtype)
+    elif backend == "memmap":
+        data, las, is_valid = read_las_with_memmap(filename, max, offset, xyz_dtype, **kwargs)
+    else:
+        raise ValueError("Unsupported backend: {}".format(backend))
+
     data = convert_location_to_dtype(data, xyz_dtype)
     data = convert_color_to_dtype(data, rgb_dtype)
     return data, las, is_valid
@@ -1,78 +1,151 @@
 #       HAKUNA MATATA
 
-import re
+from io import BytesIO
+
+import numpy as np
 import pandas as pd
 
+# element: (first char, second char, prefix length); a None second char
+# means any whitespace
+obj_elements = {
+    "v": (b"v", None, 1),
+    "vn": (b"v", b"n", 2),
+    "vt": (b"v", b"t", 2),
+    "f": (b"f", None, 1),
+}
 
-def read_obj(filename):
-    """ Reads and obj file and return the elements as pandas Dataframes.
+
+def split_obj_block(block):
+    """ Split a block of complete obj lines by element.
 
     Parameters
     ----------
-    filename: str
-        Path to the obj file.
+    block: bytes
+        Must end with a newline.
 
     Returns
     -------
-    Each obj element found as pandas Dataframe.
-
+    elements: dict
+        Map each key of obj_elements to the bytes of its lines, with the
+        prefix removed.
     """
-    v = []
-    vn = []
-    vt = []
-    f = []
-
-    with open(filename) as obj:
-        for line in obj:
-            if line.startswith('v '):
-                v.append(line.strip()[1:].split())
-
-            elif line.startswith('vn'):
-                vn.append(line.strip()[2:].split())
-
-            elif line.startswith('vt'):
-                vt.append(line.strip()[2:].split())
-
-            elif line.startswith('f'):
-                f.append(line.strip()[1:].lstrip())
-
-    points = pd.DataFrame(v, dtype='f4', columns=["x", "y", "z", "w"][:len(v[0])])
-
-    if len(vn) > 0:
-        points = points.join(pd.DataFrame(vn, dtype='f4', columns=['nx', 'ny', 'nz']))
-
-    if len(vt) > 0:
-        points = points.join(pd.DataFrame(vt, dtype='f4', columns=['u', 'v']))
-
-    data = {"points": points}
-
-    if len(f) < 1:
-        return data
-
+    buf = np.frombuffer(block, dtype=np.uint8)
+    ends = np.flatnonzero(buf == ord("\n"))
+    starts = np.r_[0, ends[:-1] + 1]
+    lengths = ends - starts + 1
+    first = buf[starts]
+    second = buf[np.minimum(starts + 1, len(buf) - 1)]
+    blank = (second == ord(" ")) | (second == ord("\t"))
+
+    elements = {}
+    for key, (c0, c1, prefix) in obj_elements.items():
+        lines = first == ord(c0)
+        lines &= blank if c1 is None else second == ord(c1)
+        if not lines.any():
+            continue
+        keep = np.repeat(lines, lengths)
+        for i in range(prefix):
+            keep[starts[lines] + i] = False
+        elements[key] = buf[keep].tobytes()
+    return elements
+
+
+def parse_obj_numbers(text, dtype):
+    """ Parse whitespace separated rows with the C parser of read_csv. """
+    return pd.read_csv(BytesIO(text), sep=r"\s+", header=None, engine="c", dtype=dtype).values
+
+
+def get_mesh_columns(face, has_normals):
+    """ Column names for the faces, from the first face line. """
+    face = face.split(b"\n", 1)[0].decode().strip()
     mesh_columns = []
-    if f[0].count("//") > 0:
+    if face.count("//") > 0:
         # wikipedia.org/wiki/Wavefront_.obj_file#Vertex_normal_indices_without_texture_coordinate_indices
-        for i in range(f[0].count("//")):
+        for i in range(face.count("//")):
             mesh_columns.append("v{}".format(i + 1))
             mesh_columns.append("vn{}".format(i + 1))
-    elif f[0].count("/") > 0:
-        if len(vn) > 0:
+    elif face.count("/") > 0:
+        if has_normals:
             # wikipedia.org/wiki/Wavefront_.obj_file#Vertex_normal_indices
-            for i in range(f[0].count("/") / 2):
+            for i in range(face.count("/") // 2):
                 mesh_columns.append("v{}".format(i + 1))
                 mesh_columns.append("vt{}".format(i + 1))
                 mesh_columns.append("vn{}".format(i + 1))
         else:
             # wikipedia.org/wiki/Wavefront_.obj_file#Vertex_texture_coordinate_indices
-            for i in range(f[0].count("/")):
+            for i in range(face.count("/")):
                 mesh_columns.append("v{}".format(i + 1))
                 mesh_columns.append("vt{}".format(i + 1))
     else:
         # wikipedia.org/wiki/Wavefront_.obj_file#Vertex_indices
-        for i in range(sum(c.isdigit() for c in f[0].split(" "))):
+        for i in range(len(face.split())):
             mesh_columns.append("v{}".format(i + 1))
+    return mesh_columns
+
+
+def read_obj(filename, block_size=1 << 26):
+    """ Reads and obj file and return the elements as pandas Dataframes.
+
+    The file is read block_size bytes at a time. Lines of each block are
+    grouped by element with NumPy and every group is parsed at once.
+
+    Parameters
+    ----------
+    filename: str
+        Path to the obj file.
+    block_size: int, optional
+        Default: 64 MiB
+        Number of bytes read at a time.
+
+    Returns
+    -------
+    Each obj element found as pandas Dataframe.
+
+    """
+    parsed = {key: [] for key in obj_elements}
+    first_face = None
+
+    with open(filename, "rb") as obj:
+        rest = b""
+        while True:
+            block = obj.read(block_size)
+            if not block:
+                block, rest = rest, b""
+                if not block:
+                    break
+                if not block.endswith(b"\n"):
+                    block += b"\n"
+            else:
+                block = rest + block
+                cut = block.rfind(b"\n") + 1
+                block, rest = block[:cut], block[cut:]
+                if not block:
+                    continue
+
+            for key, text in split_obj_block(block).items():
+                if key == "f":
+                    if first_face is None:
+                        first_face = text
+                    parsed[key].append(parse_obj_numbers(text.replace(b"/", b" "), "i4"))
+                else:
+                    parsed[key].append(parse_obj_numbers(text, "f4"))
+
+    v = np.concatenate(parsed["v"])
+    points = pd.DataFrame(v, columns=["x", "y", "z", "w"][:v.shape[1]])
+
+    if parsed["vn"]:
+        points = points.join(pd.DataFrame(np.concatenate(parsed["vn"]), columns=['nx', 'ny', 'nz']))
+
+    if parsed["vt"]:
+        points = points.join(pd.DataFrame(np.concatenate(parsed["vt"]), columns=['u', 'v']))
+
+    data = {"points": points}
+
+    if not parsed["f"]:
+        return data
 
-    mesh = pd.DataFrame([re.split(r'\D+', x) for x in f], dtype='i4', columns=mesh_columns).astype('i4')
+    mesh_columns = get_mesh_columns(first_face, len(parsed["vn"]) > 0)
+    mesh = pd.DataFrame(np.concatenate(parsed["f"]), columns=mesh_columns)
     mesh -= 1  # index starts with 1 in obj file
 
     data["mesh"] = mesh
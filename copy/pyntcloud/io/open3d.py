@@ -2,8 +2,42 @@ import numpy as np
 import pandas as pd
 
 
+def _as_vector3d(o3d, columns, scale=None):
+    """Vector3dVector from three 1D arrays.
+
+    Open3D only copies float64 C-contiguous input with a plain memcpy; any
+    other dtype goes element by element through pybind and is more than an
+    order of magnitude slower. The columns are written straight into such a
+    buffer, dividing by scale on the way if given.
+    """
+    buffer = np.empty((len(columns[0]), 3), dtype=np.float64)
+    for i, column in enumerate(columns):
+        if scale is None:
+            buffer[:, i] = column
+        else:
+            np.divide(column, scale, out=buffer[:, i])
+    return o3d.utility.Vector3dVector(buffer)
+
+
+def _from_vector3d(vector, points, names, scale=None, dtype=None):
+    """Add the columns of an Open3D vector to points without extra copies."""
+    data = np.asarray(vector)
+    for i, name in enumerate(names):
+        if scale is None:
+            points[name] = data[:, i]
+        else:
+            # scale and cast in a single pass, truncating like astype
+            column = np.empty(len(data), dtype=dtype)
+            np.multiply(data[:, i], scale, out=column, casting="unsafe")
+            points[name] = column
+
+
 def from_open3d(o3d_data, **kwargs):
-    """Create a PyntCloud instance from Open3D's PointCloud/TriangleMesh instance"""
+    """Create a PyntCloud instance from Open3D's PointCloud/TriangleMesh instance
+
+    x, y, z and normals are views of the Open3D buffers, which are float64;
+    colors are scaled to uint8 in a single pass.
+    """
     try:
         import open3d as o3d
     except ImportError:
@@ -22,32 +56,20 @@ def from_open3d(o3d_data, **kwargs):
                               columns=["x", "y", "z"])
 
         if o3d_data.vertex_colors:
-            colors = (np.asarray(o3d_data.vertex_colors) * 255).astype(np.uint8)
-            points["red"] = colors[:, 0]
-            points["green"] = colors[:, 1]
-            points["blue"] = colors[:, 2]
+            _from_vector3d(o3d_data.vertex_colors, points, ["red", "green", "blue"], 255, np.uint8)
 
         if o3d_data.vertex_normals:
-            normals = np.asarray(o3d_data.vertex_normals)
-            points["nx"] = normals[:, 0]
-            points["ny"] = normals[:, 1]
-            points["nz"] = normals[:, 2]
+            _from_vector3d(o3d_data.vertex_normals, points, ["nx", "ny", "nz"])
 
     elif isinstance(o3d_data, o3d.geometry.PointCloud):
         points = pd.DataFrame(data=np.asarray(o3d_data.points),
                               columns=["x", "y", "z"])
 
         if o3d_data.colors:
-            colors = (np.asarray(o3d_data.colors) * 255).astype(np.uint8)
-            points["red"] = colors[:, 0]
-            points["green"] = colors[:, 1]
-            points["blue"] = colors[:, 2]
+            _from_vector3d(o3d_data.colors, points, ["red", "green", "blue"], 255, np.uint8)
 
         if o3d_data.normals:
-            normals = np.asarray(o3d_data.normals)
-            points["nx"] = normals[:, 0]
-            points["ny"] = normals[:, 1]
-            points["nz"] = normals[:, 2]
+            _from_vector3d(o3d_data.normals, points, ["nx", "ny", "nz"])
 
     return {
         "points": points,
@@ -59,27 +81,47 @@ def to_open3d(cloud,
               mesh=True,
               colors=True,
               normals=True,
+              normalize_colors=False,
               **kwargs):
-    """Convert PyntCloud's instance `cloud` to Open3D's PointCloud/TriangleMesh instance"""
+    """Convert PyntCloud's instance `cloud` to Open3D's PointCloud/TriangleMesh instance
+
+    normalize_colors: bool, optional
+        Default: False
+        Divide red, green and blue by 255, as Open3D expects colors in [0, 1].
+    """
     try:
         import open3d as o3d
     except ImportError:
         raise ImportError("Open3D must be installed. Try `pip install open3d`")
 
+    points = cloud.points
+    xyz = cloud.xyz
+    vertices = _as_vector3d(o3d, [xyz[:, 0], xyz[:, 1], xyz[:, 2]])
+    color_scale = 255 if normalize_colors else None
+    if colors and {'red', 'green', 'blue'}.issubset(points.columns):
+        rgb = _as_vector3d(o3d, [points[name].values for name in ['red', 'green', 'blue']], color_scale)
+    else:
+        rgb = None
+    if normals and {'nx', 'ny', 'nz'}.issubset(points.columns):
+        nxyz = _as_vector3d(o3d, [points[name].values for name in ['nx', 'ny', 'nz']])
+    else:
+        nxyz = None
+
     if mesh and cloud.mesh is not None:
         triangle_mesh = o3d.geometry.TriangleMesh()
-        triangle_mesh.triangles = o3d.utility.Vector3iVector(cloud.mesh[["v1", "v2", "v3"]].values)
-        triangle_mesh.vertices = o3d.utility.Vector3dVector(cloud.xyz)
-        if colors and {'red', 'green', 'blue'}.issubset(cloud.points.columns):
-            triangle_mesh.vertex_colors = o3d.utility.Vector3dVector(cloud.points[['red', 'green', 'blue']].values)
-        if normals and {'nx', 'ny', 'nz'}.issubset(cloud.points.columns):
-            triangle_mesh.vertex_normals = o3d.utility.Vector3dVector(cloud.points[['nx', 'ny', 'nz']].values)
+        triangle_mesh.triangles = o3d.utility.Vector3iVector(
+            np.ascontiguousarray(cloud.mesh[["v1", "v2", "v3"]].values, dtype=np.int32))
+        triangle_mesh.vertices = vertices
+        if rgb is not None:
+            triangle_mesh.vertex_colors = rgb
+        if nxyz is not None:
+            triangle_mesh.vertex_normals = nxyz
         return triangle_mesh
     else:
         point_cloud = o3d.geometry.PointCloud()
-        point_cloud.points = o3d.utility.Vector3dVector(cloud.xyz)
-        if colors and {'red', 'green', 'blue'}.issubset(cloud.points.columns):
-            point_cloud.colors = o3d.utility.Vector3dVector(cloud.points[['red', 'green', 'blue']].values)
-        if normals and {'nx', 'ny', 'nz'}.issubset(cloud.points.columns):
-            point_cloud.normals = o3d.utility.Vector3dVector(cloud.points[['nx', 'ny', 'nz']].values)
+        point_cloud.points = vertices
+        if rgb is not None:
+            point_cloud.colors = rgb
+        if nxyz is not None:
+            point_cloud.normals = nxyz
         return point_cloud
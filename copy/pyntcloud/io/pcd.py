@@ -2,28 +2,40 @@ import re
 import struct
 import warnings
 
+try:
+    import lzf
+except ImportError:
+    lzf = None
 import numpy as np
 import pandas as pd
 
+from .ply import write_binary_element
+
 numpy_pcd_type_mappings = [(np.dtype('float32'), ('F', 4)),
                            (np.dtype('float64'), ('F', 8)),
                            (np.dtype('uint8'), ('U', 1)),
                            (np.dtype('uint16'), ('U', 2)),
                            (np.dtype('uint32'), ('U', 4)),
                            (np.dtype('uint64'), ('U', 8)),
+                           (np.dtype('int8'), ('I', 1)),
                            (np.dtype('int16'), ('I', 2)),
                            (np.dtype('int32'), ('I', 4)),
                            (np.dtype('int64'), ('I', 8))]
 numpy_type_to_pcd_type = dict(numpy_pcd_type_mappings)
 pcd_type_to_numpy_type = dict((q, p) for (p, q) in numpy_pcd_type_mappings)
 
+# dtypes without a pcd equivalent
+pcd_casts = {
+    'bool': 'uint8',
+}
+
 
 def parse_header(lines):
     metadata = {}
     for ln in lines:
         if ln.startswith('#') or len(ln) < 2:
             continue
-        match = re.match('(\w+)\s+([\w\s\.]+)', ln)
+        match = re.match(r'(\w+)\s+([\w\s\.\-]+)', ln)
         if not match:
             warnings.warn("warning: can't understand line: %s" % ln)
             continue
@@ -33,11 +45,11 @@ def parse_header(lines):
         elif key in ('fields', 'type'):
             metadata[key] = value.split()
         elif key in ('size', 'count'):
-            metadata[key] = map(int, value.split())
+            metadata[key] = list(map(int, value.split()))
         elif key in ('width', 'height', 'points'):
             metadata[key] = int(value)
         elif key == 'viewpoint':
-            metadata[key] = map(float, value.split())
+            metadata[key] = list(map(float, value.split()))
         elif key == 'data':
             metadata[key] = value.strip().lower()
         # TODO apparently count is not required?
@@ -75,9 +87,18 @@ def build_dtype(metadata):
     return dtype
 
 
+def check_lzf():
+    if lzf is None:
+        raise ImportError("python-lzf is needed for binary_compressed PCD files.")
+
+
 def read_pcd(filename):
     """ Reads and pcd file and return the elements as pandas Dataframes.
 
+    ascii, binary and binary_compressed data are supported. Binary data is
+    memory mapped and copied once, column by column. binary_compressed
+    needs python-lzf.
+
     Parameters
     ----------
     filename: str
@@ -100,52 +121,52 @@ def read_pcd(filename):
                 break
 
         if metadata['data'] == 'ascii':
-            pc_data = np.loadtxt(f, dtype=dtype, delimiter=' ')
+            df = pd.read_csv(f, sep=r"\s+", header=None, engine="c", nrows=metadata['points'],
+                             names=list(dtype.names),
+                             dtype={name: dtype.fields[name][0] for name in dtype.names},
+                             float_precision="round_trip")
 
         elif metadata['data'] == 'binary':
-            rowstep = metadata['points'] * dtype.itemsize
             # for some reason pcl adds empty space at the end of files
-            buf = f.read(rowstep)
-
-            pc_data = np.fromstring(buf, dtype=dtype)
+            pc_data = np.memmap(filename, dtype=dtype, mode='r', offset=f.tell(),
+                                shape=(metadata['points'],))
+            df = pd.DataFrame({name: np.array(pc_data[name]) for name in dtype.names}, copy=False)
 
         elif metadata['data'] == 'binary_compressed':
-            raise NotImplementedError("Go ask PCD why they use lzf compression.")
             # compressed size of data (uint32)
             # uncompressed size of data (uint32)
             # compressed data
             # junk
+            check_lzf()
             fmt = 'II'
             compressed_size, uncompressed_size =\
                 struct.unpack(fmt, f.read(struct.calcsize(fmt)))
             compressed_data = f.read(compressed_size)
-            # TODO what to use as second argument? if buf is None
-            # (compressed > uncompressed)
-            # should we read buf as raw binary?
-            #buf = lzf.decompress(compressed_data, uncompressed_size)
-            if len(buf) != uncompressed_size:
-                raise Exception('Error decompressing data')
+            buf = lzf.decompress(compressed_data, uncompressed_size)
+            if buf is None or len(buf) != uncompressed_size:
+                raise ValueError('Error decompressing data')
             # the data is stored field-by-field
-            pc_data = np.zeros(metadata['width'], dtype=dtype)
+            columns = {}
             ix = 0
-            for dti in range(len(dtype)):
-                dt = dtype[dti]
-                bytes = dt.itemsize * metadata['width']
-                column = np.fromstring(buf[ix:(ix + bytes)], dt)
-                pc_data[dtype.names[dti]] = column
-                ix += bytes
+            for name in dtype.names:
+                dt = dtype.fields[name][0]
+                columns[name] = np.frombuffer(buf, dtype=dt, count=metadata['points'], offset=ix)
+                ix += dt.itemsize * metadata['points']
+            df = pd.DataFrame(columns)
 
-    df = pd.DataFrame(pc_data)
+        else:
+            raise ValueError("Unsupported DATA type: {}".format(metadata['data']))
 
     # check if dataframe contains color info
     col = 'rgb'
     if col in df.columns:
         # get the 'rgb' column from dataframe
         packed_rgb = df.rgb.values
-        # 'rgb' values are stored as float
+        # 'rgb' values are usually stored as float
         # treat them as int
-        packed_rgb = packed_rgb.astype(np.float32).tostring()
-        packed_rgb = np.frombuffer(packed_rgb, dtype=np.int32)
+        if packed_rgb.dtype.itemsize != 4:
+            packed_rgb = packed_rgb.astype(np.float32)
+        packed_rgb = np.ascontiguousarray(packed_rgb).view(np.uint32)
         # unpack 'rgb' into 'red', 'green' and 'blue' channel
         df['red'] = np.asarray((packed_rgb >> 16) & 255, dtype=np.uint8)
         df['green'] = np.asarray((packed_rgb >> 8) & 255, dtype=np.uint8)
@@ -155,3 +176,81 @@ def read_pcd(filename):
 
     data['points'] = df
     return data
+
+
+def write_pcd(filename, points, data="binary", chunk_size=1 << 20):
+    """ Write points to a .pcd file.
+
+    red, green and blue are packed into a float 'rgb' field, as PCL does.
+
+    Parameters
+    ----------
+    filename: str
+        The created file will be named with this
+    points: pd.DataFrame
+    data: {"ascii", "binary", "binary_compressed"}
+        Default: "binary"
+        binary_compressed needs python-lzf.
+    chunk_size: int
+        Number of rows packed at a time when writing binary.
+
+    Returns
+    -------
+    boolean
+        True if no problems
+    """
+    if data not in ("ascii", "binary", "binary_compressed"):
+        raise ValueError("data must be 'ascii', 'binary' or 'binary_compressed'")
+    if data == "binary_compressed":
+        check_lzf()
+    if not filename.endswith('pcd'):
+        filename += '.pcd'
+
+    if set(["red", "green", "blue"]).issubset(points.columns):
+        rgb = ((points["red"].values.astype(np.uint32) & 255) << 16 |
+               (points["green"].values.astype(np.uint32) & 255) << 8 |
+               (points["blue"].values.astype(np.uint32) & 255))
+        points = points.drop(columns=["red", "green", "blue"]).assign(rgb=rgb.view(np.float32))
+
+    casts = {column: pcd_casts[dtype.name] for column, dtype in points.dtypes.items()
+             if dtype.name in pcd_casts}
+    if casts:
+        points = points.astype(casts, copy=False)
+
+    types = [numpy_type_to_pcd_type[dtype] for dtype in points.dtypes]
+    header = [
+        "VERSION .7",
+        "FIELDS " + " ".join(points.columns),
+        "SIZE " + " ".join(str(size) for _, size in types),
+        "TYPE " + " ".join(t for t, _ in types),
+        "COUNT " + " ".join(["1"] * len(types)),
+        "WIDTH {}".format(len(points)),
+        "HEIGHT 1",
+        "VIEWPOINT 0 0 0 1 0 0 0",
+        "POINTS {}".format(len(points)),
+        "DATA " + data,
+    ]
+
+    with open(filename, 'w') as pcd:
+        for line in header:
+            pcd.write("%s\n" % line)
+
+    if data == "ascii":
+        points.to_csv(filename, sep=" ", index=False, header=False, mode='a',
+                      encoding='ascii')
+
+    elif data == "binary":
+        with open(filename, 'ab') as pcd:
+            write_binary_element(pcd, points, chunk_size)
+
+    else:
+        # field-by-field
+        buf = b"".join(np.ascontiguousarray(points[column].values).tobytes()
+                       for column in points.columns)
+        # worst case size of an LZF stream
+        compressed = lzf.compress(buf, len(buf) + len(buf) // 32 + 64)
+        with open(filename, 'ab') as pcd:
+            pcd.write(struct.pack('II', len(compressed), len(buf)))
+            pcd.write(compressed)
+
+    return True
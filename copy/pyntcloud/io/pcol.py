@@ -0,0 +1,202 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import lz4.block as lz4_block
+except ImportError:
+    lz4_block = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+import numpy as np
+import pandas as pd
+
+PCOL_VERSION = 1
+
+
+def get_codec(compression):
+    """ (compress, decompress) functions for a compression name.
+
+    decompress takes the compressed bytes and the uncompressed size.
+    """
+    if compression == "lz4":
+        if lz4_block is None:
+            raise ImportError("lz4 is needed for lz4 compression.")
+        return (lambda buf: lz4_block.compress(buf, store_size=False),
+                lambda buf, size: lz4_block.decompress(buf, uncompressed_size=size))
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstandard is needed for zstd compression.")
+        return (lambda buf: zstandard.ZstdCompressor(level=3).compress(buf),
+                lambda buf, size: zstandard.ZstdDecompressor().decompress(buf, max_output_size=size))
+    raise ValueError("Unsupported compression: {}".format(compression))
+
+
+def default_compression():
+    """ Fastest available compression, None if no compressor is installed. """
+    if lz4_block is not None:
+        return "lz4"
+    if zstandard is not None:
+        return "zstd"
+    return None
+
+
+def write_column(path, values, compression, block_size):
+    """ Write one column to path.
+
+    Returns
+    -------
+    blocks: list of int or None
+        Compressed size of each block of block_size rows, None if the
+        column is stored raw.
+    """
+    values = np.ascontiguousarray(values)
+    if compression is None:
+        values.tofile(path)
+        return None
+    compress = get_codec(compression)[0]
+    blocks = []
+    with open(path, "wb") as f:
+        for start in range(0, len(values), block_size):
+            compressed = compress(values[start:start + block_size].tobytes())
+            f.write(compressed)
+            blocks.append(len(compressed))
+    return blocks
+
+
+def read_column(path, dtype, length, blocks, compression, block_size, mmap):
+    if blocks is None:
+        if mmap and length:
+            # copy on write: the DataFrame can be modified, the file is not
+            return np.memmap(path, dtype=dtype, mode="c", shape=(length,))
+        return np.fromfile(path, dtype=dtype, count=length)
+    decompress = get_codec(compression)[1]
+    values = np.empty(length, dtype=dtype)
+    with open(path, "rb") as f:
+        for i, size in enumerate(blocks):
+            block = values[i * block_size:(i + 1) * block_size]
+            block[:] = np.frombuffer(decompress(f.read(size), block.nbytes), dtype=dtype)
+    return values
+
+
+def write_pcol(filename, compression="auto", block_size=1 << 20, n_jobs=None, **kwargs):
+    """ Write the elements to a .pcol directory: a header.json and one file per column.
+
+    An existing directory is overwritten; until the write completes it has
+    no header.json and can't be read.
+
+    Parameters
+    ----------
+    filename: str
+        The created directory will be named with this
+    compression: "auto", "lz4", "zstd" or None, optional
+        Default: "auto", the fastest installed compressor or None.
+        Compressed columns are split in blocks of block_size rows; raw
+        columns can be memory mapped on read.
+    block_size: int, optional
+    n_jobs: int, optional
+        Default: None
+        Number of threads writing columns.
+    kwargs: Elements of the pyntcloud to be saved
+        DataFrames are stored column by column, arrays (e.g. offset) in
+        the header.
+
+    Returns
+    -------
+    boolean
+        True if no problems
+    """
+    if not filename.endswith('pcol'):
+        filename += '.pcol'
+    if compression == "auto":
+        compression = default_compression()
+    if compression is not None:
+        get_codec(compression)
+    os.makedirs(filename, exist_ok=True)
+    # an overwritten cache is invalid as soon as its first column is rewritten
+    header_path = os.path.join(filename, "header.json")
+    if os.path.exists(header_path):
+        os.remove(header_path)
+
+    header = {"version": PCOL_VERSION, "compression": compression, "block_size": block_size,
+              "elements": {}, "attributes": {}}
+    jobs = []
+    for name, element in kwargs.items():
+        if element is None:
+            continue
+        if isinstance(element, pd.DataFrame):
+            columns = []
+            for i, (column, dtype) in enumerate(element.dtypes.items()):
+                columns.append({"name": column, "dtype": dtype.str, "file": "{}.{}.bin".format(name, i)})
+                jobs.append((columns[-1], element[column].values))
+            header["elements"][name] = {"length": len(element), "columns": columns}
+        else:
+            header["attributes"][name] = np.asarray(element).tolist()
+
+    with ThreadPoolExecutor(n_jobs) as executor:
+        blocks = executor.map(
+            lambda job: write_column(os.path.join(filename, job[0]["file"]), job[1], compression, block_size),
+            jobs)
+        for (column, _), column_blocks in zip(jobs, blocks):
+            column["blocks"] = column_blocks
+
+    # the header goes last, so a partially written cache is never read
+    tmp = os.path.join(filename, "header.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(header, f)
+    os.replace(tmp, header_path)
+    return True
+
+
+def read_pcol(filename, columns=None, mmap=True, n_jobs=None):
+    """ Read a .pcol directory and store the elements in pandas DataFrames.
+
+    Parameters
+    ----------
+    filename: str
+        Path to the directory
+    columns: list of str, optional
+        Default: None, all columns
+        Points columns to read.
+    mmap: bool, optional
+        Default: True
+        Memory map the raw columns instead of reading them.
+    n_jobs: int, optional
+        Default: None
+        Number of threads reading compressed columns.
+
+    Returns
+    -------
+    data: dict
+        Elements as pandas DataFrames, attributes as arrays.
+    """
+    with open(os.path.join(filename, "header.json")) as f:
+        header = json.load(f)
+    if header["version"] > PCOL_VERSION:
+        raise ValueError("Unsupported pcol version: {}".format(header["version"]))
+
+    jobs = []
+    for name, element in header["elements"].items():
+        for column in element["columns"]:
+            if name == "points" and columns is not None and column["name"] not in columns:
+                continue
+            jobs.append((name, column, element["length"]))
+
+    def read(job):
+        name, column, length = job
+        return read_column(os.path.join(filename, column["file"]), np.dtype(column["dtype"]), length,
+                           column["blocks"], header["compression"], header["block_size"], mmap)
+
+    with ThreadPoolExecutor(n_jobs) as executor:
+        values = list(executor.map(read, jobs))
+
+    data = {}
+    for name in header["elements"]:
+        data[name] = pd.DataFrame({column["name"]: column_values
+                                   for (element, column, _), column_values in zip(jobs, values)
+                                   if element == name}, copy=False)
+    for name, value in header["attributes"].items():
+        data[name] = np.asarray(value)
+    return data
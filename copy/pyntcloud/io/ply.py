@@ -111,50 +111,84 @@ def read_ply(filename):
     data = {}
 
     if fmt == 'ascii':
-        top = count
-        bottom = 0 if mesh_size is None else mesh_size
+        with open(filename, 'rb') as ply:
+            ply.seek(end_header)
+            names = [x[0] for x in dtypes["vertex"]]
 
-        names = [x[0] for x in dtypes["vertex"]]
+            data["points"] = pd.read_csv(ply, sep=r"\s+", header=None, engine="c",
+                                         nrows=points_size, names=names,
+                                         dtype=dict(dtypes["vertex"]), float_precision="round_trip")
 
-        data["points"] = pd.read_csv(filename, sep=" ", header=None, engine="python",
-                                     skiprows=top, skipfooter=bottom, usecols=names, names=names)
+            if mesh_size:
+                # the parser reads ahead, find where the faces start
+                ply.seek(end_header)
+                skip_lines(ply, points_size)
 
-        for n, col in enumerate(data["points"].columns):
-            data["points"][col] = data["points"][col].astype(
-                dtypes["vertex"][n][1])
+                names = [x[0] for x in dtypes["face"]]
+                usecols = [1, 2, 3, 5, 6, 7, 8, 9, 10] if has_texture else [1, 2, 3]
 
-        if mesh_size :
-            top = count + points_size
+                data["mesh"] = pd.read_csv(ply, sep=r"\s+", header=None, engine="c",
+                                           nrows=mesh_size, usecols=usecols,
+                                           names=names, dtype=dict(dtypes["face"]))
 
-            names = np.array([x[0] for x in dtypes["face"]])
-            usecols = [1, 2, 3, 5, 6, 7, 8, 9, 10] if has_texture else [1, 2, 3]
-            names = names[usecols]
+    else:
+        vertex_dtype = np.dtype(dtypes["vertex"])
+        data["points"] = read_binary_element(filename, vertex_dtype, end_header, points_size)
+        if mesh_size:
+            data["mesh"] = read_binary_element(filename, np.dtype(dtypes["face"]),
+                                               end_header + vertex_dtype.itemsize * points_size,
+                                               mesh_size)
+            data["mesh"].drop('n_points', axis=1, inplace=True)
 
-            data["mesh"] = pd.read_csv(
-                filename, sep=" ", header=None, engine="python", skiprows=top, usecols=usecols, names=names)
+    return data
 
-            for n, col in enumerate(data["mesh"].columns):
-                data["mesh"][col] = data["mesh"][col].astype(
-                    dtypes["face"][n + 1][1])
 
-    else:
-        with open(filename, 'rb') as ply:
-            ply.seek(end_header)
-            points_np = np.fromfile(ply, dtype=dtypes["vertex"], count=points_size)
-            if ext != sys_byteorder:
-                points_np = points_np.byteswap().newbyteorder()
-            data["points"] = pd.DataFrame(points_np)
-            if mesh_size:
-                mesh_np = np.fromfile(ply, dtype=dtypes["face"], count=mesh_size)
-                if ext != sys_byteorder:
-                    mesh_np = mesh_np.byteswap().newbyteorder()
-                data["mesh"] = pd.DataFrame(mesh_np)
-                data["mesh"].drop('n_points', axis=1, inplace=True)
+def skip_lines(f, n, block_size=1 << 24):
+    """ Move the binary file f to the start of the n-th line after its position
+    """
+    while n > 0:
+        start = f.tell()
+        block = f.read(block_size)
+        if not block:
+            return
+        found = block.count(b'\n')
+        if found >= n:
+            end = -1
+            for _ in range(n):
+                end = block.index(b'\n', end + 1)
+            f.seek(start + end + 1)
+            return
+        n -= found
+
+
+def read_binary_element(filename, dtype, offset, size):
+    """ Read a block of fixed size records through a memory map
+
+    Each property is copied once, as a contiguous column in native byte
+    order; the records themselves are never loaded as a whole.
 
-    return data
+    Parameters
+    ----------
+    filename: str
+    dtype: numpy structured dtype
+    offset: int
+        Position of the block in the file, in bytes.
+    size: int
+        Number of records.
+
+    Returns
+    -------
+    element: pandas DataFrame
+    """
+    if not size:
+        return pd.DataFrame({name: np.empty(0, dtype.fields[name][0].newbyteorder('='))
+                             for name in dtype.names}, copy=False)
+    records = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=(size,))
+    return pd.DataFrame({name: records[name].astype(dtype.fields[name][0].newbyteorder('='))
+                         for name in dtype.names}, copy=False)
 
 
-def write_ply(filename, points=None, mesh=None, as_text=False):
+def write_ply(filename, points=None, mesh=None, as_text=False, chunk_size=1 << 20):
     """
 
     Parameters
@@ -165,6 +199,8 @@ def write_ply(filename, points=None, mesh=None, as_text=False):
     mesh: ndarray
     as_text: boolean
         Set the write mode of the file. Default: binary
+    chunk_size: int
+        Number of rows packed at a time when writing binary.
 
     Returns
     -------
@@ -175,6 +211,12 @@ def write_ply(filename, points=None, mesh=None, as_text=False):
     if not filename.endswith('ply'):
         filename += '.ply'
 
+    if points is not None:
+        # checked before the file is created, so a failed cast leaves nothing behind
+        casts = get_ply_casts(points)
+        if casts:
+            points = points.astype(casts, copy=False)
+
     # open in text mode to write the header
     with open(filename, 'w') as ply:
         header = ['ply']
@@ -208,13 +250,80 @@ def write_ply(filename, points=None, mesh=None, as_text=False):
     else:
         with open(filename, 'ab') as ply:
             if points is not None:
-                points.to_records(index=False).tofile(ply)
+                write_binary_element(ply, points, chunk_size)
             if mesh is not None:
-                mesh.to_records(index=False).tofile(ply)
+                write_binary_element(ply, mesh, chunk_size)
 
     return True
 
 
+def write_binary_element(ply, df, chunk_size=1 << 20):
+    """ Write the rows of df as packed records, chunk_size rows at a time
+
+    Only one chunk of records is held in memory, instead of the whole
+    element as to_records would.
+
+    Parameters
+    ----------
+    ply: file opened in binary mode
+    df: pandas DataFrame
+    chunk_size: int
+    """
+    dtype = np.dtype([(column, dtype) for column, dtype in df.dtypes.items()])
+    columns = [df[column].values for column in df.columns]
+    records = np.empty(min(chunk_size, len(df)), dtype=dtype)
+    for start in range(0, len(df), chunk_size):
+        stop = min(start + chunk_size, len(df))
+        chunk = records[:stop - start]
+        for name, column in zip(dtype.names, columns):
+            chunk[name] = column[start:stop]
+        chunk.tofile(ply)
+
+
+# ply names of the dtypes that can be written as they are
+property_formats = {
+    'int8': 'char',
+    'uint8': 'uchar',
+    'int16': 'short',
+    'uint16': 'ushort',
+    'int32': 'int',
+    'uint32': 'uint',
+    'float32': 'float',
+    'float64': 'double'
+}
+
+# dtypes without a ply equivalent
+ply_casts = {
+    'bool': 'uint8',
+    'int64': 'int32',
+    'uint64': 'uint32'
+}
+
+
+def get_ply_casts(df):
+    """ Casts of the columns without a ply equivalent, see ply_casts.
+
+    Raises
+    ------
+    ValueError
+        If a 64 bit integer column has values out of the range of its cast.
+    """
+    casts = {}
+    for column, dtype in df.dtypes.items():
+        if dtype.name not in ply_casts:
+            continue
+        cast = np.dtype(ply_casts[dtype.name])
+        if dtype.kind in "iu" and len(df):
+            values = df[column].values
+            info = np.iinfo(cast)
+            if values.min() < info.min or values.max() > info.max:
+                raise ValueError(
+                    "Column '{}' has values out of the {} range of ply; cast it to float64 first"
+                    .format(column, cast.name))
+        casts[column] = cast.name
+    return casts
+
+
 def describe_element(name, df):
     """ Takes the columns of the dataframe and builds a ply-like description
 
@@ -227,16 +336,13 @@ def describe_element(name, df):
     -------
     element: list[str]
     """
-    property_formats = {'f': 'float', 'u': 'uchar', 'i': 'int'}
     element = ['element ' + name + ' ' + str(len(df))]
 
     if name == 'face':
         element.append("property list uchar int vertex_indices")
 
     else:
-        for i in range(len(df.columns)):
-            # get first letter of dtype to infer format
-            f = property_formats[str(df.dtypes[i])[0]]
-            element.append('property ' + f + ' ' + df.columns.values[i])
+        for column, dtype in df.dtypes.items():
+            element.append('property ' + property_formats[dtype.name] + ' ' + column)
 
     return element
@@ -205,34 +205,42 @@ def plot_voxelgrid(voxelgrid,
                    backend='pythreejs',
                    cmap='Oranges',
                    **kwargs):
-    feature_vector = voxelgrid.get_feature_vector(mode)
-
     # Plot 2D
     if d == 2:
+        if voxelgrid.sparse:
+            raise ValueError("2d plotting needs a dense grid; build the VoxelGrid with sparse=False")
         return plot_voxelgrid_with_matplotlib(voxelgrid,
-                                              feature_vector,
+                                              voxelgrid.get_feature_vector(mode),
                                               cmap)
     elif d != 3:
         raise ValueError("d must be 2 or 3")
 
+    scaled_shape = np.asarray(voxelgrid.shape) / min(voxelgrid.shape)
+    if voxelgrid.sparse:
+        # one value per occupied voxel, in the order of get_occupied_voxels
+        values = voxelgrid.get_feature_vector(mode)
+        # grid positions of the occupied voxels, as argwhere gives for a dense grid
+        indices = np.stack(np.unravel_index(voxelgrid.get_occupied_voxels(), voxelgrid.x_y_z), axis=1)
+        voxel_centers = (indices * scaled_shape).astype(np.float32)
+    else:
+        feature_vector = voxelgrid.get_feature_vector(mode)
+        values = feature_vector.ravel()
+        values = values[np.nonzero(values)]
+        voxel_centers = (np.argwhere(feature_vector) * scaled_shape).astype(np.float32)
+
     # Voxelgrid colors
     if mode != 'binary' and plt is None:
         raise ImportError("matplotlib is required for non-binary plotting")
     elif mode != 'binary':
         s_m = plt.cm.ScalarMappable(cmap=cmap)
-        flattened = feature_vector.ravel()
-        rgba = s_m.to_rgba(flattened[np.nonzero(flattened)])
+        rgba = s_m.to_rgba(values)
         voxel_colors = rgba[:, :3].astype(np.float32)
     elif voxelgrid.colors is not None:
         voxel_colors = (voxelgrid.voxel_colors / 255).astype(np.float32)
     else:
-        voxel_colors = np.full((voxelgrid.n_voxels, 3), 200, dtype=np.int)
+        voxel_colors = np.full((len(voxel_centers), 3), 200 / 255, dtype=np.float32)
 
     # Plot 3D
-    feature_vector = voxelgrid.get_feature_vector(mode)
-    scaled_shape = np.asarray(voxelgrid.shape) / min(voxelgrid.shape)
-    voxel_centers = (np.argwhere(feature_vector) * scaled_shape).astype(np.float32)
-
     if backend == 'pythreejs':
         plot_voxelgrid_with_pythreejs(
             voxel_centers, voxel_colors, **kwargs)
@@ -3,7 +3,7 @@
 HAKUNA MATATA
 """
 
-from .fitters import single_fit
+from .fitters import single_fit, batch_fit, sequential_fit
 from .models import RansacPlane, RansacSphere
 from .samplers import RandomRansacSampler, VoxelgridRansacSampler
 
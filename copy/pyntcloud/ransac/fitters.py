@@ -4,8 +4,14 @@
 Ransac Implementation
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+from scipy.spatial import cKDTree
+
 from .samplers import RandomRansacSampler
+from ..structures import VoxelGrid
 
 
 def single_fit(points, model, sampler=RandomRansacSampler,
@@ -64,7 +70,6 @@ def single_fit(points, model, sampler=RandomRansacSampler,
         k_points = sampler.get_sample()
 
         if not model.are_valid(k_points):
-            print(k_points)
             continue
 
         model.fit(k_points)
@@ -88,3 +93,272 @@ def single_fit(points, model, sampler=RandomRansacSampler,
 
     else:
         return best_inliers
+
+
+def batch_fit(points, model,
+              model_kwargs={},
+              max_iterations=1000,
+              confidence=0.99,
+              batch_size=64,
+              subset_size=20000,
+              n_keep=8,
+              chunk_size=65536,
+              n_jobs=1,
+              return_model=False,
+              random_state=None):
+    """ RANSAC that fits and scores many hypotheses at once.
+
+    Each batch of hypotheses is scored on a random subset of the points
+    first; only the n_keep best are scored on all of them. The number of
+    iterations shrinks as better models are found, following
+    log(1 - confidence) / log(1 - w ** k) for the best inlier ratio w.
+
+    points: (N, 3) ndarray
+
+    model: Ransac_Model
+        Class (NOT INSTANCE!) implementing fit_batch, get_batch_distances
+        and set_params, like RansacPlane and RansacSphere.
+
+    model_kwargs: dict, optional
+        Default: {}
+        Arguments that will be used on model's instantiation.
+
+    max_iterations: int, optional
+        Default: 1000
+        Maximum number of hypotheses.
+
+    confidence: float, optional
+        Default: 0.99
+        Probability of having drawn at least one all-inlier sample when the
+        search stops. None to always run max_iterations.
+
+    batch_size: int, optional
+        Default: 64
+        Hypotheses fitted and scored together.
+
+    subset_size: int, optional
+        Default: 20000
+        Number of points used for the preemptive scoring.
+
+    n_keep: int, optional
+        Default: 8
+        Hypotheses of each batch that are scored on all the points.
+
+    chunk_size: int, optional
+        Default: 65536
+        Points scored at a time, bounding memory to chunk_size * n_keep.
+
+    n_jobs: int, optional
+        Default: 1
+        Processes sharing max_iterations; -1 to use all the CPUs.
+
+    return_model: bool, optional (default False)
+        Whether the best fitted model will be returned or not.
+
+    random_state: int, optional
+        Default: None
+        Seed for reproducible results.
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+    seeds = np.random.SeedSequence(random_state).spawn(n_jobs)
+    options = (max_iterations // n_jobs or 1, confidence, batch_size, subset_size, n_keep, chunk_size)
+
+    if n_jobs == 1:
+        results = [_batch_search(points, model, model_kwargs, *options, seeds[0])]
+    else:
+        with ProcessPoolExecutor(n_jobs) as executor:
+            futures = [executor.submit(_batch_search, points, model, model_kwargs, *options, seed)
+                       for seed in seeds]
+            results = [future.result() for future in futures]
+
+    best_params, n_best_inliers = max(results, key=lambda result: result[1])
+
+    model = model(**model_kwargs)
+    if best_params is None:
+        best_inliers = np.zeros(len(points), dtype=bool)
+    else:
+        model.set_params(best_params)
+        best_inliers = model.get_distances(points) <= model.max_dist
+
+    if return_model:
+        if best_inliers.any():
+            model.least_squares_fit(points[best_inliers])
+        return best_inliers, model
+
+    else:
+        return best_inliers
+
+
+def sequential_fit(points, model,
+                   model_kwargs={},
+                   max_models=50,
+                   min_inliers=100,
+                   max_failures=5,
+                   radius=None,
+                   cluster_size=None,
+                   max_iterations=1000,
+                   confidence=0.99,
+                   random_state=None):
+    """ Extract several models by fitting one, removing its inliers and repeating.
+
+    points: (N, 3) ndarray
+
+    model: Ransac_Model
+        Class (NOT INSTANCE!) supporting batch_fit.
+
+    model_kwargs: dict, optional
+        Default: {}
+        Arguments that will be used on model's instantiation.
+
+    max_models: int, optional
+        Default: 50
+        Maximum number of models to extract.
+
+    min_inliers: int, optional
+        Default: 100
+        Models with fewer points are discarded.
+
+    max_failures: int, optional
+        Default: 5
+        Stop after this many consecutive discarded models.
+
+    radius: float, optional
+        Default: None
+        If given, each hypothesis is searched only among the unassigned
+        points within radius of a random unassigned point, using a KDTree.
+        Recommended for large clouds with many small models.
+
+    cluster_size: float, optional
+        Default: None
+        If given, the inliers of each model are voxelized with this size
+        and only the largest 26-connected cluster is kept, so coplanar but
+        distant surfaces get different labels.
+
+    max_iterations, confidence:
+        Passed to batch_fit.
+
+    random_state: int, optional
+        Default: None
+        Seed for reproducible results.
+
+    Returns
+    -------
+    labels: (N,) ndarray of int32
+        Index of the model each point belongs to; -1 if unassigned.
+    models: list of Ransac_Model
+        Instances fitted by least squares to the points of each label.
+    """
+    rng = np.random.default_rng(random_state)
+    labels = np.full(len(points), -1, dtype=np.int32)
+    models = []
+    k = model(**model_kwargs).k
+    kdtree = None if radius is None else cKDTree(points)
+
+    n_failures = 0
+    while len(models) < max_models and n_failures < max_failures:
+        remaining = np.flatnonzero(labels == -1)
+        if len(remaining) < min_inliers:
+            break
+
+        if kdtree is None:
+            candidates = remaining
+        else:
+            seed = points[rng.choice(remaining)]
+            candidates = np.asarray(kdtree.query_ball_point(seed, radius), dtype=np.int64)
+            candidates = candidates[labels[candidates] == -1]
+            if len(candidates) < k:
+                n_failures += 1
+                continue
+
+        inliers, fitted = batch_fit(points[candidates], model, model_kwargs,
+                                    max_iterations=max_iterations,
+                                    confidence=confidence,
+                                    return_model=True,
+                                    random_state=rng.integers(2 ** 32))
+        if inliers.sum() < k:
+            n_failures += 1
+            continue
+
+        members = remaining[fitted.get_distances(points[remaining]) <= fitted.max_dist]
+        if cluster_size is not None and len(members):
+            members = _largest_cluster(points, members, cluster_size)
+        if len(members) < min_inliers:
+            n_failures += 1
+            continue
+
+        fitted.least_squares_fit(points[members])
+        labels[members] = len(models)
+        models.append(fitted)
+        n_failures = 0
+
+    return labels, models
+
+
+def _largest_cluster(points, members, cluster_size):
+    """ Members in the largest 26-connected voxel cluster. """
+    voxelgrid = VoxelGrid(points=points[members],
+                          size_x=cluster_size, size_y=cluster_size, size_z=cluster_size,
+                          regular_bounding_box=False, sparse=True)
+    voxelgrid.compute()
+    _, voxel_labels = voxelgrid.get_voxel_clusters()
+    _, inverse = voxelgrid.get_occupied_voxels(return_inverse=True)
+    point_labels = voxel_labels[inverse]
+    return members[point_labels == np.argmax(np.bincount(point_labels))]
+
+
+def _batch_search(points, model, model_kwargs, max_iterations, confidence,
+                  batch_size, subset_size, n_keep, chunk_size, seed):
+    """ Search loop of batch_fit. Returns best params and number of inliers. """
+    model = model(**model_kwargs)
+    rng = np.random.default_rng(seed)
+    n_points = len(points)
+
+    best_params = None
+    n_best_inliers = 0
+    n_required = max_iterations
+    n_done = 0
+    while n_done < n_required:
+        size = min(batch_size, n_required - n_done)
+        n_done += size
+
+        samples = np.sort(rng.integers(0, n_points, (size, model.k)), axis=1)
+        params, valid = model.fit_batch(points[samples])
+        valid &= (samples[:, 1:] != samples[:, :-1]).all(axis=1)
+        params = params[valid]
+        if not len(params):
+            continue
+
+        if len(params) > n_keep and n_points > subset_size:
+            subset = points[rng.integers(0, n_points, subset_size)]
+            subset_scores = _count_inliers(model, params, subset, chunk_size)
+            params = params[np.argsort(subset_scores)[-n_keep:]]
+
+        scores = _count_inliers(model, params, points, chunk_size)
+        best = np.argmax(scores)
+        if scores[best] > n_best_inliers:
+            n_best_inliers = scores[best]
+            best_params = params[best]
+            if confidence is not None:
+                n_required = min(max_iterations, _required_iterations(
+                    n_best_inliers / n_points, model.k, confidence))
+
+    return best_params, n_best_inliers
+
+
+def _count_inliers(model, params, points, chunk_size):
+    counts = np.zeros(len(params), dtype=np.int64)
+    for start in range(0, len(points), chunk_size):
+        distances = model.get_batch_distances(params, points[start:start + chunk_size])
+        counts += (distances <= model.max_dist).sum(axis=0)
+    return counts
+
+
+def _required_iterations(inlier_ratio, k, confidence):
+    """ Hypotheses needed to draw an all-inlier sample with the given confidence. """
+    p_good = inlier_ratio ** k
+    if p_good >= 1:
+        return 1
+    if p_good <= 0:
+        return np.inf
+    return int(np.ceil(np.log(1 - confidence) / np.log(1 - p_good)))
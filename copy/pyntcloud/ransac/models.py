@@ -30,6 +30,36 @@ class RansacModel(ABC):
     def are_valid(self, k_points):
         pass
 
+    def fit_batch(self, k_points):
+        """ Fit many hypotheses at once. Used by batch_fit.
+
+        Parameters
+        ----------
+        k_points: (B, k, 3) ndarray
+
+        Returns
+        -------
+        params: (B, P) ndarray
+        valid: (B,) bool ndarray
+        """
+        raise NotImplementedError(
+            "{} does not support batch fitting".format(type(self).__name__))
+
+    def get_batch_distances(self, params, points):
+        """ Distances of points to many hypotheses.
+
+        Returns
+        -------
+        distances: (N, B) ndarray
+        """
+        raise NotImplementedError(
+            "{} does not support batch fitting".format(type(self).__name__))
+
+    def set_params(self, params):
+        """ Make this instance the model described by one row of fit_batch. """
+        raise NotImplementedError(
+            "{} does not support batch fitting".format(type(self).__name__))
+
 
 class RansacPlane(RansacModel, Plane):
 
@@ -40,6 +70,22 @@ class RansacPlane(RansacModel, Plane):
     def are_valid(self, k_points):
         return True
 
+    def fit_batch(self, k_points):
+        """ params are the plane equations a, b, c, d with unit normals. """
+        normals = np.cross(k_points[:, 1] - k_points[:, 0], k_points[:, 2] - k_points[:, 0])
+        norms = np.linalg.norm(normals, axis=1)
+        valid = norms > 0
+        normals[valid] /= norms[valid, None]
+        d = -np.einsum("ij,ij->i", normals, k_points[:, 0])
+        return np.column_stack([normals, d]), valid
+
+    def get_batch_distances(self, params, points):
+        return np.abs(points @ params[:, :3].T + params[:, 3])
+
+    def set_params(self, params):
+        self.normal = np.asarray(params[:3], dtype=np.float64)
+        self.point = -params[3] * self.normal
+
 
 class RansacSphere(RansacModel, Sphere):
 
@@ -55,3 +101,34 @@ class RansacSphere(RansacModel, Sphere):
             return False
         else:
             return True
+
+    def fit_batch(self, k_points):
+        """ params are the center and radius.
+
+        Solves 2 p . c + t = |p| ** 2 with t = r ** 2 - |c| ** 2 for the
+        four points of each hypothesis.
+        """
+        # relative to the first point, to keep precision on large coordinates
+        origin = k_points[:, 0]
+        local = k_points - origin[:, None]
+        A = np.empty(k_points.shape[:2] + (4,))
+        A[:, :, :3] = 2 * local
+        A[:, :, 3] = 1
+        f = np.einsum("ijk,ijk->ij", local, local)
+        # coplanar samples have singular systems
+        scale = np.abs(local).max(axis=(1, 2))
+        valid = np.abs(np.linalg.det(A)) > 1e-9 * (2 * scale) ** 3
+        A[~valid] = np.eye(4)
+        solution = np.linalg.solve(A, f[..., None])[..., 0]
+        centers = solution[:, :3]
+        radius_2 = solution[:, 3] + np.einsum("ij,ij->i", centers, centers)
+        valid &= radius_2 > 0
+        return np.column_stack([centers + origin, np.sqrt(np.abs(radius_2))]), valid
+
+    def get_batch_distances(self, params, points):
+        lengths = np.linalg.norm(points[:, None, :] - params[:, :3], axis=2)
+        return np.abs(lengths - params[:, 3])
+
+    def set_params(self, params):
+        self.center = np.asarray(params[:3], dtype=np.float64)
+        self.radius = params[3]
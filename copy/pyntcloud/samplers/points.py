@@ -1,7 +1,8 @@
 from .base import Sampler
 
 import numpy as np
-import pandas as pd
+
+from ..utils.array import morton_encode
 
 
 class PointsSampler(Sampler):
@@ -23,10 +24,14 @@ class RandomPointsSampler(PointsSampler):
         super().__init__(pyntcloud=pyntcloud)
         self.n = n
 
-    def compute(self):
+    def get_indices(self):
+        """Positions of the sampled points."""
         if self.n > len(self.points):
             raise ValueError("n can't be higher than the number of points in the PyntCloud.")
-        return self.points.sample(self.n).reset_index(drop=True)
+        return np.random.choice(len(self.points), self.n, replace=False)
+
+    def compute(self):
+        return self.points.iloc[self.get_indices()].reset_index(drop=True)
 
 
 class FarthestPointsSampler(PointsSampler):
@@ -38,45 +43,97 @@ class FarthestPointsSampler(PointsSampler):
         Number of unique points that will be chosen.
     d_metric: 3*3 numpy array
         a positive semi-definite matrix which defines a distance metric
+    voxel_size: float, optional
+        Default: None
+        If given, only the first point of each voxel of this size is a
+        candidate, which makes sampling from very large clouds feasible.
     """
+    # number of candidates per Z-order block
+    block_size = 256
 
-    def __init__(self, *, pyntcloud, n, d_metric=np.eye(3)):
+    def __init__(self, *, pyntcloud, n, d_metric=np.eye(3), voxel_size=None):
         """d_metric -> Euclidean distance space by default, can be modified to other Mahalanobis distance as well"""
         super().__init__(pyntcloud=pyntcloud)
         self.n = n
         if not np.all(np.linalg.eigvals(d_metric) >= 0):
             raise ValueError("the distance metric must be positive semi-definite")
         self.d_metric = d_metric
-
-    def cal_distance(self, point, solution_set):
-        """
-        :param point: points which is not sampled yet, N*10 or N*3 numpy array
-        :param solution_set: the points which has been selected, M*3 or M*10 array
-        :return: a (N, ) array, where each element is equal to the sum of distance
-        of all points in 'solution_set' w.r.t the unselected point in the 'point'
+        self.voxel_size = voxel_size
+
+    def get_candidates(self, xyz):
+        """Positions of the points that can be sampled."""
+        if self.voxel_size is None:
+            return np.arange(len(xyz))
+        voxels = np.floor((xyz - xyz.min(0)) / self.voxel_size).astype(np.int64)
+        voxel_n = np.ravel_multi_index(voxels.T, voxels.max(0) + 1)
+        return np.sort(np.unique(voxel_n, return_index=True)[1])
+
+    def get_indices(self):
+        """Positions of the sampled points, in selection order.
+
+        Incremental farthest search: each new point is the candidate whose
+        distance to the closest already selected point is the largest.
+        Candidates are stored in Z-order blocks, and a block is only updated
+        when its bounding box is closer to the new point than its current
+        farthest distance, so late iterations touch a small part of the cloud.
         """
-        distance_sum = np.zeros(len(point))
-
-        for pt in solution_set:
-            distance_sum += np.diag(np.dot((point[:, :3]-pt[:3]), self.d_metric@(point[:, :3]-pt[:3]).T))
-        return distance_sum
-
-    def compute(self):
-        "incremental farthest search"
         if self.n > len(self.points):
             raise ValueError("sampled points can't be more than the original input")
-        remaining_points = self.points.values
-
-        # the sampled points set as the return
-        select_idx = np.random.randint(low=0, high=len(self.points))
-        # to remain the shape as (1, n) instead of (n, )
-        solution_set = remaining_points[select_idx: select_idx+1]
-        remaining_points = np.delete(remaining_points, select_idx, 0)
+        xyz = self.pyntcloud.xyz
+        candidates = self.get_candidates(xyz)
+        if self.n > len(candidates):
+            raise ValueError("sampled points can't be more than the voxel candidates")
+
+        # the Mahalanobis distance is the euclidean distance after
+        # projecting on the eigenvectors scaled by sqrt(eigenvalues)
+        w, v = np.linalg.eigh((self.d_metric + self.d_metric.T) / 2)
+        transformed = (xyz[candidates] @ v) * np.sqrt(np.clip(w, 0, None))
+        # centre in float64 first: distances don't change, and float32 keeps
+        # its precision on large absolute (e.g. UTM) coordinates
+        transformed = (transformed - transformed.min(0)).astype(np.float32)
+
+        first = np.random.randint(low=0, high=len(candidates))
+
+        extent = np.ptp(transformed, axis=0)
+        extent[extent == 0] = 1
+        grid = ((transformed - transformed.min(0)) / extent * (2 ** 21 - 1)).astype(np.int64)
+        order = np.argsort(morton_encode(grid[:, 0], grid[:, 1], grid[:, 2]))
+
+        n_blocks = -(-len(order) // self.block_size)
+        padding = n_blocks * self.block_size - len(order)
+        # padding repeats the last point and can never be selected
+        order = np.append(order, np.full(padding, order[-1]))
+        blocks = transformed[order].reshape(n_blocks, self.block_size, 3)
+        block_low = blocks.min(1)
+        block_high = blocks.max(1)
+
+        min_distance = np.full((n_blocks, self.block_size), np.inf, dtype=np.float32)
+        min_distance.reshape(-1)[len(order) - padding:] = -np.inf
+        block_farthest = min_distance.max(1)
+
+        selected = np.empty(self.n, dtype=np.int64)
+        selected[0] = np.flatnonzero(order == first)[0]
+        for i in range(1, self.n):
+            last = divmod(selected[i - 1], self.block_size)
+            min_distance[last] = -np.inf
+            point = blocks[last]
+
+            gap = np.maximum(block_low - point, point - block_high)
+            np.maximum(gap, 0, out=gap)
+            touched = np.flatnonzero(np.einsum("ij,ij->i", gap, gap) < block_farthest)
+            touched = np.union1d(touched, last[:1])
+
+            diffs = blocks[touched] - point
+            distance = np.einsum("ijk,ijk->ij", diffs, diffs)
+            updated = np.minimum(min_distance[touched], distance)
+            min_distance[touched] = updated
+            block_farthest[touched] = updated.max(1)
+
+            block = np.argmax(block_farthest)
+            selected[i] = block * self.block_size + np.argmax(min_distance[block])
+
+        return candidates[order[selected]]
 
-        for _ in range(self.n - 1):
-            distance_sum = self.cal_distance(remaining_points, solution_set)
-            select_idx = np.argmax(distance_sum)
-            solution_set = np.concatenate([solution_set, remaining_points[select_idx:select_idx+1]], axis=0)
-            remaining_points = np.delete(remaining_points, select_idx, 0)
-
-        return pd.DataFrame(solution_set, columns=self.points.columns)
+    def compute(self):
+        "incremental farthest search"
+        return self.points.iloc[self.get_indices()].reset_index(drop=True)
@@ -1,8 +1,6 @@
 import numpy as np
 import pandas as pd
 
-from scipy.spatial.distance import cdist
-
 from .base import Sampler
 
 
@@ -19,7 +17,7 @@ class VoxelgridCentersSampler(VoxelgridSampler):
     """Returns the points that represent each occupied voxel's center."""
     def compute(self):
         return pd.DataFrame(
-            self.voxelgrid.voxel_centers[np.unique(self.voxelgrid.voxel_n)],
+            self.voxelgrid.get_voxel_centers(self.voxelgrid.get_occupied_voxels()),
             columns=["x", "y", "z"])
 
 
@@ -37,24 +35,63 @@ class VoxelgridNearestSampler(VoxelgridSampler):
         super().__init__(pyntcloud=pyntcloud, voxelgrid_id=voxelgrid_id)
         self.n = n
 
+    def get_indices(self):
+        """Positions of the sampled points, grouped by voxel."""
+        xyz = self.pyntcloud.xyz
+        diffs = xyz - self.voxelgrid.get_voxel_centers(self.voxelgrid.voxel_n)
+        distances = np.einsum("ij,ij->i", diffs, diffs)
+        return first_n_per_voxel(self.voxelgrid.voxel_n, distances, self.n)
+
     def compute(self):
-        voxel_n_id = "voxel_n({})".format(self.voxelgrid_id)
-        if voxel_n_id not in self.pyntcloud.points:
-            self.pyntcloud.points[voxel_n_id] = self.voxelgrid.voxel_n
-        nearests = []
-        for voxel_n, x in self.pyntcloud.points.groupby(voxel_n_id, sort=False):
-            xyz = x.loc[:, ["x", "y", "z"]].values
-            center = self.voxelgrid.voxel_centers[voxel_n]
-            voxel_nearest = cdist([center], xyz)[0].argsort()[:self.n]
-            nearests.extend(x.index.values[voxel_nearest])
-        return self.pyntcloud.points.iloc[nearests].reset_index(drop=True)
+        return self.pyntcloud.points.iloc[self.get_indices()].reset_index(drop=True)
 
 
 class VoxelgridHighestSampler(VoxelgridSampler):
     """Returns the highest points of each voxel."""
+    def get_indices(self):
+        """Positions of the sampled points, one per voxel."""
+        return first_n_per_voxel(self.voxelgrid.voxel_n, -self.pyntcloud.xyz[:, 2])
+
     def compute(self):
-        voxel_n_id = "voxel_n({})".format(self.voxelgrid_id)
-        if voxel_n_id not in self.pyntcloud.points:
-            self.pyntcloud.points[voxel_n_id] = self.voxelgrid.voxel_n
-        return self.pyntcloud.points.iloc[
-            self.pyntcloud.points.groupby(voxel_n_id)["z"].idxmax()].reset_index(drop=True)
+        return self.pyntcloud.points.iloc[self.get_indices()].reset_index(drop=True)
+
+
+def first_n_per_voxel(voxel_n, key, n=1):
+    """Positions of the n points with the lowest key inside each voxel.
+
+    Parameters
+    ----------
+    voxel_n: (N,) ndarray of int
+    key: (N,) ndarray
+    n: int, optional
+        Default: 1
+
+    Returns
+    -------
+    indices: ndarray of int
+        Sorted by voxel, then by key.
+    """
+    if n == 1:
+        # a single sort by voxel plus a segmented min is enough
+        order = np.argsort(voxel_n)
+    else:
+        order = np.argsort(key, kind="stable")
+        order = order[np.argsort(voxel_n[order], kind="stable")]
+    sorted_voxels = voxel_n[order]
+    is_first = np.empty(len(order), dtype=bool)
+    is_first[:1] = True
+    np.not_equal(sorted_voxels[1:], sorted_voxels[:-1], out=is_first[1:])
+    starts = np.flatnonzero(is_first)
+
+    if n == 1:
+        sorted_key = key[order]
+        group = np.cumsum(is_first) - 1
+        candidates = np.flatnonzero(sorted_key == np.minimum.reduceat(sorted_key, starts)[group])
+        # keep one candidate per voxel when the minimum is tied
+        keep = np.empty(len(candidates), dtype=bool)
+        keep[:1] = True
+        np.not_equal(group[candidates[1:]], group[candidates[:-1]], out=keep[1:])
+        return order[candidates[keep]]
+
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.append(starts, len(order))))
+    return order[rank < n]
@@ -35,6 +35,7 @@ from .xyz import (
     PlaneFit,
     SphereFit,
     CustomFit,
+    SequentialFit,
     SphericalCoordinates,
     CylindricalCoordinates
 )
@@ -70,6 +71,7 @@ ALL_SF = {
     # XYZ
     'custom_fit': CustomFit,
     'plane_fit': PlaneFit,
+    'sequential_fit': SequentialFit,
     'sphere_fit': SphereFit,
     'spherical_coords': SphericalCoordinates,
     'cylindrical_coords': CylindricalCoordinates
@@ -1,7 +1,7 @@
 import numpy as np
 
 from .base import ScalarField
-from ..utils.array import cov3D
+from ..utils.array import cov3D, eigh3D, eigvalsh3D
 
 
 class KNeighborsScalarField(ScalarField):
@@ -10,36 +10,51 @@ class KNeighborsScalarField(ScalarField):
     ----------
     k_neighbors: ndarray
         (N, k, 3) The k neighbours associated to each of the N points.
+    dtype: numpy dtype, optional
+        Default: None
+        Precision used for the covariance matrices and the eigen solver.
+        None keeps the dtype of PyntCloud.xyz; "float32" halves memory and
+        is noticeably faster, at the cost of precision on badly conditioned
+        neighbourhoods.
     """
 
-    def __init__(self, *, pyntcloud, k_neighbors):
+    def __init__(self, *, pyntcloud, k_neighbors, dtype=None):
         super().__init__(pyntcloud=pyntcloud)
         # add each point to its neighborhood
         self.k_neighbors_idx = np.c_[range(len(k_neighbors)), k_neighbors]
+        self.dtype = dtype
 
     def extract_info(self):
-        self.k_neighbors = self.pyntcloud.xyz[self.k_neighbors_idx]
+        xyz = self.pyntcloud.xyz
+        if self.dtype is not None:
+            # convert once here instead of converting the (N, k, 3) gather
+            xyz = xyz.astype(self.dtype, copy=False)
+        self.k_neighbors = xyz[self.k_neighbors_idx]
 
 
 class EigenValues(KNeighborsScalarField):
     """Compute the eigen values of each point's neighbourhood.
+
+    Parameters
+    ----------
+    method: {"eigh", "analytic"}, optional
+        Default: "eigh"
+        Solver used on the symmetric covariance matrices.
+        See utils.array.eigvalsh3D.
     """
+    def __init__(self, *, pyntcloud, k_neighbors, dtype=None, method="eigh"):
+        super().__init__(pyntcloud=pyntcloud, k_neighbors=k_neighbors, dtype=dtype)
+        self.method = method
+
     def compute(self):
         cov = cov3D(self.k_neighbors)
-        eigenvalues = np.linalg.eigvals(cov)
-        sort = eigenvalues.argsort()
-
-        # range from 0-shape[0] to allow indexing along axis 1 and 2
-        idx_trick = range(eigenvalues.shape[0])
-
-        e1 = eigenvalues[idx_trick, sort[:, 2]]
-        e2 = eigenvalues[idx_trick, sort[:, 1]]
-        e3 = eigenvalues[idx_trick, sort[:, 0]]
+        # ascending order
+        eigenvalues = eigvalsh3D(cov, method=self.method)
 
         k = self.k_neighbors.shape[1]
-        self.to_be_added["e1({})".format(k)] = e1
-        self.to_be_added["e2({})".format(k)] = e2
-        self.to_be_added["e3({})".format(k)] = e3
+        self.to_be_added["e1({})".format(k)] = eigenvalues[:, 2]
+        self.to_be_added["e2({})".format(k)] = eigenvalues[:, 1]
+        self.to_be_added["e3({})".format(k)] = eigenvalues[:, 0]
 
 
 class EigenDecomposition(KNeighborsScalarField):
@@ -47,24 +62,17 @@ class EigenDecomposition(KNeighborsScalarField):
     """
     def compute(self):
         cov = cov3D(self.k_neighbors)
-        eigenvalues, eigenvectors = np.linalg.eig(cov)
-        sort = eigenvalues.argsort()
-
-        # range from 0-shape[0] to allow indexing along axis 1 and 2
-        idx_trick = range(eigenvalues.shape[0])
-
-        e1 = eigenvalues[idx_trick, sort[:, 2]]
-        e2 = eigenvalues[idx_trick, sort[:, 1]]
-        e3 = eigenvalues[idx_trick, sort[:, 0]]
+        # ascending order
+        eigenvalues, eigenvectors = eigh3D(cov)
 
         k = self.k_neighbors.shape[1]
-        self.to_be_added["e1({})".format(k)] = e1
-        self.to_be_added["e2({})".format(k)] = e2
-        self.to_be_added["e3({})".format(k)] = e3
+        self.to_be_added["e1({})".format(k)] = eigenvalues[:, 2]
+        self.to_be_added["e2({})".format(k)] = eigenvalues[:, 1]
+        self.to_be_added["e3({})".format(k)] = eigenvalues[:, 0]
 
-        ev1 = eigenvectors[idx_trick, :, sort[:, 2]]
-        ev2 = eigenvectors[idx_trick, :, sort[:, 1]]
-        ev3 = eigenvectors[idx_trick, :, sort[:, 0]]
+        ev1 = eigenvectors[:, :, 2]
+        ev2 = eigenvectors[:, :, 1]
+        ev3 = eigenvectors[:, :, 0]
 
         self.to_be_added["ev1_x({})".format(k)] = ev1[:, 0]
         self.to_be_added["ev1_y({})".format(k)] = ev1[:, 1]
@@ -80,13 +88,13 @@ class EigenDecomposition(KNeighborsScalarField):
 
 
 class UnorientedNormals(KNeighborsScalarField):
-    """Compute normals using SVD.
+    """Compute normals as the eigenvector of the smallest eigenvalue.
     """
     def compute(self):
         cov = cov3D(self.k_neighbors)
-        u, s, v = np.linalg.svd(cov)
+        _, eigenvectors = eigh3D(cov)
 
-        normals = u[:, :, -1]
+        normals = eigenvectors[:, :, 0]
 
         k = self.k_neighbors.shape[1]
         self.to_be_added["nx({})".format(k)] = normals[:, 0]
@@ -48,24 +48,7 @@ class EuclideanClusters(VoxelgridScalarField):
     def compute(self):
         name = "{}({})".format("clusters", self.voxelgrid_id)
 
-        to_be_processed = np.zeros(self.voxelgrid.n_voxels, dtype=bool)
-        to_be_processed[np.unique(self.voxelgrid.voxel_n)] = True
-
-        clusters = np.zeros(self.voxelgrid.voxel_n.shape[0])
-
-        C = 0
-        while np.any(to_be_processed):
-            Q = []
-            Q.append(np.random.choice(np.where(to_be_processed)[0]))
-
-            for voxel in Q:
-                clusters[np.where(self.voxelgrid.voxel_n == voxel)[0]] = C
-                to_be_processed[voxel] = False
-                neighbors = self.voxelgrid.get_voxel_neighbors(voxel)
-                for neighbor in neighbors:
-                    if to_be_processed[neighbor]:
-                        Q.append(neighbor)
-                        to_be_processed[neighbor] = False
-            C += 1
-
-        self.to_be_added[name] = clusters
+        _, inverse = self.voxelgrid.get_occupied_voxels(return_inverse=True)
+        _, labels = self.voxelgrid.get_voxel_clusters()
+
+        self.to_be_added[name] = labels[inverse]
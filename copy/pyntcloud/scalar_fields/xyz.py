@@ -6,6 +6,8 @@ from ..geometry.coord_systems import (
     cartesian_to_cylindrical)
 from ..ransac import (
     single_fit,
+    batch_fit,
+    sequential_fit,
     RANSAC_MODELS,
     RANSAC_SAMPLERS)
 
@@ -18,32 +20,49 @@ class XYZScalarField(ScalarField):
 class PlaneFit(XYZScalarField):
     """
     Get inliers of the best RansacPlane found.
+
+    If confidence is given, batch_fit is used instead of single_fit and
+    max_iterations becomes an upper bound.
     """
 
-    def __init__(self, *, pyntcloud, max_dist=1e-4, max_iterations=100, n_inliers_to_stop=None):
+    def __init__(self, *, pyntcloud, max_dist=1e-4, max_iterations=100, n_inliers_to_stop=None,
+                 confidence=None, n_jobs=1):
         self.model = RANSAC_MODELS["plane"]
         self.sampler = RANSAC_SAMPLERS["random"]
         self.name = "is_plane"
         self.model_kwargs = {"max_dist": max_dist}
         self.max_iterations = max_iterations
         self.n_inliers_to_stop = n_inliers_to_stop
+        self.confidence = confidence
+        self.n_jobs = n_jobs
 
         super().__init__(pyntcloud=pyntcloud)
 
     def compute(self):
-        inliers = single_fit(self.points, self.model, self.sampler,
-                             model_kwargs=self.model_kwargs,
-                             max_iterations=self.max_iterations,
-                             n_inliers_to_stop=self.n_inliers_to_stop)
+        if self.confidence is None:
+            inliers = single_fit(self.points, self.model, self.sampler,
+                                 model_kwargs=self.model_kwargs,
+                                 max_iterations=self.max_iterations,
+                                 n_inliers_to_stop=self.n_inliers_to_stop)
+        else:
+            inliers = batch_fit(self.points, self.model,
+                                model_kwargs=self.model_kwargs,
+                                max_iterations=self.max_iterations,
+                                confidence=self.confidence,
+                                n_jobs=self.n_jobs)
         self.to_be_added[self.name] = inliers.astype(np.uint8)
 
 
 class SphereFit(XYZScalarField):
     """
     Get inliers of the best RansacSphere found.
+
+    If confidence is given, batch_fit is used instead of single_fit and
+    max_iterations becomes an upper bound.
     """
 
-    def __init__(self, *, pyntcloud, max_dist=1e-4, max_iterations=100, n_inliers_to_stop=None):
+    def __init__(self, *, pyntcloud, max_dist=1e-4, max_iterations=100, n_inliers_to_stop=None,
+                 confidence=None, n_jobs=1):
         super().__init__(pyntcloud=pyntcloud)
         self.model = RANSAC_MODELS["sphere"]
         self.sampler = RANSAC_SAMPLERS["random"]
@@ -51,12 +70,21 @@ class SphereFit(XYZScalarField):
         self.model_kwargs = {"max_dist": max_dist}
         self.max_iterations = max_iterations
         self.n_inliers_to_stop = n_inliers_to_stop
+        self.confidence = confidence
+        self.n_jobs = n_jobs
 
     def compute(self):
-        inliers = single_fit(self.points, self.model, self.sampler,
-                             model_kwargs=self.model_kwargs,
-                             max_iterations=self.max_iterations,
-                             n_inliers_to_stop=self.n_inliers_to_stop)
+        if self.confidence is None:
+            inliers = single_fit(self.points, self.model, self.sampler,
+                                 model_kwargs=self.model_kwargs,
+                                 max_iterations=self.max_iterations,
+                                 n_inliers_to_stop=self.n_inliers_to_stop)
+        else:
+            inliers = batch_fit(self.points, self.model,
+                                model_kwargs=self.model_kwargs,
+                                max_iterations=self.max_iterations,
+                                confidence=self.confidence,
+                                n_jobs=self.n_jobs)
         self.to_be_added[self.name] = inliers.astype(np.uint8)
 
 
@@ -84,6 +112,48 @@ class CustomFit(XYZScalarField):
         self.to_be_added[self.name] = inliers.astype(np.uint8)
 
 
+class SequentialFit(XYZScalarField):
+    """
+    Get the index of the model each point belongs to, extracting several
+    RansacPlane or RansacSphere one after another. -1 for unassigned points.
+
+    The fitted models are stored in pyntcloud.fitted_models[name].
+    """
+
+    def __init__(self, *, pyntcloud, model="plane", max_dist=1e-4, max_models=50,
+                 min_inliers=100, max_failures=5, radius=None, cluster_size=None,
+                 max_iterations=1000, confidence=0.99, random_state=None, name=None):
+        super().__init__(pyntcloud=pyntcloud)
+        self.model = RANSAC_MODELS[model]
+        self.name = name or "{}_id".format(model)
+        self.model_kwargs = {"max_dist": max_dist}
+        self.max_models = max_models
+        self.min_inliers = min_inliers
+        self.max_failures = max_failures
+        self.radius = radius
+        self.cluster_size = cluster_size
+        self.max_iterations = max_iterations
+        self.confidence = confidence
+        self.random_state = random_state
+
+    def compute(self):
+        labels, self.models = sequential_fit(self.points, self.model,
+                                             model_kwargs=self.model_kwargs,
+                                             max_models=self.max_models,
+                                             min_inliers=self.min_inliers,
+                                             max_failures=self.max_failures,
+                                             radius=self.radius,
+                                             cluster_size=self.cluster_size,
+                                             max_iterations=self.max_iterations,
+                                             confidence=self.confidence,
+                                             random_state=self.random_state)
+        self.to_be_added[self.name] = labels
+
+    def get_and_set(self):
+        self.pyntcloud.fitted_models[self.name] = self.models
+        return super().get_and_set()
+
+
 class SphericalCoordinates(XYZScalarField):
     """
     Get radial, azimuthal and polar values.
@@ -1,19 +1,23 @@
 import numpy as np
 
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 from scipy.spatial import cKDTree
 
 from .base import Structure
 from ..plot.voxelgrid import plot_voxelgrid
-from ..utils.array import cartesian
+from ..utils.array import cartesian, morton_encode
+from ..utils.groupby import (groupby_max, groupby_mean, groupby_min,
+                             groupby_percentile, groupby_std)
 
-try:
-    from ..utils.numba import groupby_max, groupby_count, groupby_sum
-    is_numba_avaliable = True
-except ImportError:
-    is_numba_avaliable = False
+# 13 offsets covering half of the 26-neighbourhood; the other half is
+# obtained by symmetry when building undirected adjacency.
+HALF_NEIGHBORHOOD = cartesian(([-1, 0, 1], [-1, 0, 1], [-1, 0, 1]))[14:]
 
 
 class VoxelGrid(Structure):
+    # dense exports above this size are refused instead of exhausting memory
+    max_dense_voxels = 2 ** 30
 
     def __init__(self,
                  *,
@@ -21,7 +25,8 @@ class VoxelGrid(Structure):
                  colors=None,
                  n_x=1, n_y=1, n_z=1,
                  size_x=None, size_y=None, size_z=None,
-                 regular_bounding_box=True):
+                 regular_bounding_box=True,
+                 sparse=False):
         """Grid of voxels with support for different build methods.
 
         Parameters
@@ -42,12 +47,20 @@ class VoxelGrid(Structure):
             Default: True
             If True, the bounding box of the point cloud will be adjusted
             in order to have all the dimensions of equal length.
+        sparse : bool, optional
+            Default: False
+            If True, only the occupied voxels are stored: voxel_centers is
+            not built and feature vectors are returned per occupied voxel.
+            Use it for fine voxel sizes, where the dense grid would not
+            fit in memory.
         """
         super().__init__(points=points)
         self.colors = colors
-        self.x_y_z = np.asarray([n_x, n_y, n_z])
+        # int64 so n_voxels does not overflow on platforms where int is 32 bits
+        self.x_y_z = np.asarray([n_x, n_y, n_z], dtype=np.int64)
         self.sizes = np.asarray([size_x, size_y, size_z])
         self.regular_bounding_box = regular_bounding_box
+        self.sparse = sparse
 
         self.id = None
         self.xyzmin, self.xyzmax = None, None
@@ -58,6 +71,9 @@ class VoxelGrid(Structure):
         self.voxel_n = None
         self.voxel_centers = None
         self.voxel_colors = None
+        self._occupied = None
+        self._occupied_inverse = None
+        self._occupied_order = None
 
     @classmethod
     def extract_info(cls, pyntcloud):
@@ -77,7 +93,7 @@ class VoxelGrid(Structure):
         """ABC API."""
         xyzmin = self._points.min(0)
         xyzmax = self._points.max(0)
-        xyz_range = self._points.ptp(0)
+        xyz_range = xyzmax - xyzmin
 
         if self.regular_bounding_box:
             #: adjust to obtain a minimum bounding box with all sides of equal length
@@ -88,10 +104,11 @@ class VoxelGrid(Structure):
         for n, size in enumerate(self.sizes):
             if size is None:
                 continue
-            margin = (((self._points.ptp(0)[n] // size) + 1) * size) - self._points.ptp(0)[n]
+            margin = (((xyz_range[n] // size) + 1) * size) - xyz_range[n]
             xyzmin[n] -= margin / 2
             xyzmax[n] += margin / 2
-            self.x_y_z[n] = ((xyzmax[n] - xyzmin[n]) / size).astype(int)
+            # rint, not astype(int): the division can land just below an integer
+            self.x_y_z[n] = np.rint((xyzmax[n] - xyzmin[n]) / size)
 
         self.xyzmin = xyzmin
         self.xyzmax = xyzmax
@@ -115,59 +132,135 @@ class VoxelGrid(Structure):
         self.id = "V({},{},{})".format(self.x_y_z, self.sizes, self.regular_bounding_box)
 
         # find where each point lies in corresponding segmented axis
-        # -1 so index are 0-based; clip for edge cases
-        self.voxel_x = np.clip(np.searchsorted(self.segments[0], self._points[:, 0]) - 1, 0, self.x_y_z[0])
-        self.voxel_y = np.clip(np.searchsorted(self.segments[1], self._points[:, 1]) - 1, 0, self.x_y_z[1])
-        self.voxel_z = np.clip(np.searchsorted(self.segments[2], self._points[:, 2]) - 1, 0,  self.x_y_z[2])
+        self.voxel_x, self.voxel_y, self.voxel_z = self.get_voxel_indices(self._points)
         self.voxel_n = np.ravel_multi_index([self.voxel_x, self.voxel_y, self.voxel_z], self.x_y_z)
+        self._occupied = None
+        self._occupied_inverse = None
+        self._occupied_order = None
 
         # compute center of each voxel
-        midsegments = [(self.segments[i][1:] + self.segments[i][:-1]) / 2 for i in range(3)]
-        self.voxel_centers = cartesian(midsegments).astype(np.float32)
+        if not self.sparse:
+            midsegments = [(self.segments[i][1:] + self.segments[i][:-1]) / 2 for i in range(3)]
+            self.voxel_centers = cartesian(midsegments).astype(np.float32)
 
-        # compute voxel colors
+        # compute voxel colors, one row per occupied voxel
         if self.colors is not None:
-            order = np.argsort(self.voxel_n)
-            _, breaks, counts = np.unique(self.voxel_n[order],
-                                          return_index=True,
-                                          return_counts=True)
-            repeated_counts = np.repeat(counts[:, None], 3, axis=1)
-            # why square? watch this: https://www.youtube.com/watch?v=LKnqECcg6Gw
-            squared_colors = np.square(self.colors[order].astype(np.int64))
-            summed_colors = np.add.reduceat(squared_colors,
-                                            breaks,
-                                            axis=0)
-            averaged_colors = np.sqrt(summed_colors / repeated_counts)
+            _, inverse = self.get_occupied_voxels(return_inverse=True)
+            counts = self.get_voxel_counts()
+            averaged_colors = np.empty((len(counts), 3))
+            for i in range(3):
+                # why square? watch this: https://www.youtube.com/watch?v=LKnqECcg6Gw
+                squared = np.square(self.colors[:, i].astype(np.float64))
+                averaged_colors[:, i] = np.sqrt(np.bincount(inverse, squared) / counts)
             self.voxel_colors = np.rint(averaged_colors).astype(np.uint8)
 
+    def get_voxel_indices(self, points):
+        """Voxel index along each axis for the given points.
+
+        The grid is uniform, so the index is floor((p - xyzmin) / shape),
+        clipped to the grid; O(N) instead of a searchsorted per axis.
+
+        Returns
+        -------
+        voxel_x, voxel_y, voxel_z: (N,) ndarray of int64
+        """
+        indices = []
+        for i in range(3):
+            if self.shape[i] == 0:
+                # all points share this coordinate
+                index = np.zeros(len(points), dtype=np.int64)
+            else:
+                index = np.floor((points[:, i] - self.xyzmin[i]) / self.shape[i]).astype(np.int64)
+                # points on the max border belong to the last voxel
+                np.clip(index, 0, self.x_y_z[i] - 1, out=index)
+            indices.append(index)
+        return indices
+
     def query(self, points):
         """ABC API. Query structure.
 
         TODO Make query_voxelgrid an independent function, and add a light
         save mode where only segments and x_y_z are saved.
         """
-        voxel_x = np.clip(np.searchsorted(
-            self.segments[0], points[:, 0]) - 1, 0, self.x_y_z[0])
-        voxel_y = np.clip(np.searchsorted(
-            self.segments[1], points[:, 1]) - 1, 0, self.x_y_z[1])
-        voxel_z = np.clip(np.searchsorted(
-            self.segments[2], points[:, 2]) - 1, 0, self.x_y_z[2])
+        voxel_x, voxel_y, voxel_z = self.get_voxel_indices(points)
         voxel_n = np.ravel_multi_index([voxel_x, voxel_y, voxel_z], self.x_y_z)
 
         return voxel_n
 
-    def get_feature_vector(self, mode="binary"):
+    def get_morton_keys(self):
+        """64-bit Morton (Z-order) key of each point's voxel.
+
+        An alternative to voxel_n whose sort order keeps neighbouring voxels
+        close together. Requires at most 2 ** 21 voxels along each axis.
+
+        Returns
+        -------
+        keys: (N,) ndarray of uint64
+        """
+        if np.any(self.x_y_z > 2 ** 21):
+            raise ValueError("Morton keys support up to 2 ** 21 voxels per axis")
+        return morton_encode(self.voxel_x, self.voxel_y, self.voxel_z)
+
+    def get_voxel_centers(self, voxels):
+        """Centers of the given voxels.
+
+        Works for sparse grids too, where voxel_centers is not available.
+
+        Parameters
+        ----------
+        voxels: (M,) ndarray of int
+            Indices in 'C' order, like voxel_n.
+
+        Returns
+        -------
+        centers: (M, 3) ndarray of float32
+        """
+        if self.voxel_centers is not None:
+            return self.voxel_centers[voxels]
+        indices = np.stack(np.unravel_index(voxels, self.x_y_z), axis=1)
+        return (self.xyzmin + (indices + 0.5) * self.shape).astype(np.float32)
+
+    def get_voxel_counts(self):
+        """Number of points inside each voxel of get_occupied_voxels()."""
+        occupied, inverse = self.get_occupied_voxels(return_inverse=True)
+        return np.bincount(inverse, minlength=len(occupied))
+
+    def to_dense(self, values, fill_value=0):
+        """Scatter per occupied voxel values into a [n_x, n_y, n_z] array.
+
+        Parameters
+        ----------
+        values: (M,) ndarray
+            Aligned with get_occupied_voxels(), i.e. the output of
+            get_feature_vector(mode, dense=False).
+        fill_value: scalar, optional
+            Default: 0
+            Value of the empty voxels.
+        """
+        if self.n_voxels > self.max_dense_voxels:
+            raise MemoryError(
+                "{} voxels are too many for a dense array; "
+                "use dense=False".format(self.n_voxels))
+        vector = np.full(self.n_voxels, fill_value, dtype=np.result_type(values, fill_value))
+        vector[self.get_occupied_voxels()] = values
+        return vector.reshape(self.x_y_z)
+
+    def get_feature_vector(self, mode="binary", dense=None):
         """Return a vector of size self.n_voxels. See mode options below.
 
         Parameters
         ----------
         mode: str in available modes. See Notes
             Default "binary"
+        dense: bool, optional
+            Default: None, meaning not self.sparse.
+            If False, return one value per occupied voxel instead, aligned
+            with get_occupied_voxels().
 
         Returns
         -------
         feature_vector: [n_x, n_y, n_z] ndarray
-            See Notes.
+            See Notes. (M,) ndarray if not dense.
 
         Notes
         -----
@@ -184,45 +277,166 @@ class VoxelGrid(Structure):
             between the voxel's center and the closest point. 1 on the surface,
             0 on voxels further than 2 * voxel side.
 
+        count
+            number of points inside voxel.
+
         x_max, y_max, z_max
             Maximum coordinate value of points inside each voxel.
 
+        x_min, y_min, z_min
+            Minimum coordinate value of points inside each voxel.
+
         x_mean, y_mean, z_mean
             Mean coordinate value of points inside each voxel.
+
+        x_std, y_std, z_std
+            Standard deviation of the coordinate values inside each voxel.
+
+        x_p{q}, y_p{q}, z_p{q}
+            q-th percentile of the coordinate values inside each voxel,
+            for example "z_p95".
         """
-        vector = np.zeros(self.n_voxels)
+        if dense is None:
+            dense = not self.sparse
+
+        if mode == "TDF":
+            if not dense:
+                voxels = self.get_occupied_voxels()
+                centers = self.get_voxel_centers(voxels)
+            elif self.voxel_centers is None:
+                centers = self.get_voxel_centers(np.arange(self.n_voxels))
+            else:
+                centers = self.voxel_centers
+            # truncation = np.linalg.norm(self.shape)
+            kdt = cKDTree(self._points)
+            vector, i = kdt.query(centers, workers=-1)
+            return vector.reshape(self.x_y_z) if dense else vector
+
+        occupied, inverse = self.get_occupied_voxels(return_inverse=True)
 
         if mode == "binary":
-            vector[np.unique(self.voxel_n)] = 1
+            vector = np.ones(len(occupied))
 
         elif mode == "density":
-            count = np.bincount(self.voxel_n)
-            vector[:len(count)] = count
-            vector /= len(self.voxel_n)
-
-        elif mode == "TDF":
-            # truncation = np.linalg.norm(self.shape)
-            kdt = cKDTree(self._points)
-            vector, i = kdt.query(self.voxel_centers, n_jobs=-1)
-
-        elif mode.endswith("_max"):
-            if not is_numba_avaliable:
-                raise ImportError("numba is required to compute {}".format(mode))
-            axis = {"x_max": 0, "y_max": 1, "z_max": 2}
-            vector = groupby_max(self._points, self.voxel_n, axis[mode], vector)
-
-        elif mode.endswith("_mean"):
-            if not is_numba_avaliable:
-                raise ImportError("numba is required to compute {}".format(mode))
-            axis = {"x_mean": 0, "y_mean": 1, "z_mean": 2}
-            voxel_sum = groupby_sum(self._points, self.voxel_n, axis[mode], np.zeros(self.n_voxels))
-            voxel_count = groupby_count(self._points, self.voxel_n, np.zeros(self.n_voxels))
-            vector = np.nan_to_num(voxel_sum / voxel_count)
+            vector = self.get_voxel_counts() / len(self.voxel_n)
+
+        elif mode == "count":
+            vector = self.get_voxel_counts()
+
+        elif mode[:2] in ("x_", "y_", "z_"):
+            values = self._points[:, "xyz".index(mode[0])]
+            stat = mode[2:]
+            if stat == "max":
+                vector = groupby_max(values, inverse, self._occupied_order)
+            elif stat == "min":
+                vector = groupby_min(values, inverse, self._occupied_order)
+            elif stat == "mean":
+                vector = groupby_mean(values, inverse, len(occupied))
+            elif stat == "std":
+                vector = groupby_std(values, inverse, len(occupied))
+            elif stat.startswith("p") and stat[1:].replace(".", "", 1).isdigit():
+                vector = groupby_percentile(values, inverse, float(stat[1:]))
+            else:
+                raise NotImplementedError("{} is not a supported feature vector mode".format(mode))
 
         else:
             raise NotImplementedError("{} is not a supported feature vector mode".format(mode))
 
-        return vector.reshape(self.x_y_z)
+        if dense:
+            return self.to_dense(vector)
+        return vector
+
+    def get_occupied_voxels(self, return_inverse=False):
+        """Sorted indices of the non-empty voxels.
+
+        Computed once and cached, so it can be used as a sparse index of
+        the grid with np.searchsorted.
+
+        Parameters
+        ----------
+        return_inverse: bool, optional
+            Default: False
+            If True, also return the position of each point's voxel inside
+            the occupied voxels array.
+
+        Returns
+        -------
+        occupied: (M,) ndarray
+        inverse: (N,) ndarray
+            Only if return_inverse.
+        """
+        if self._occupied is None:
+            # same as np.unique, but the sort order is kept for the
+            # reduceat based feature vectors
+            order = np.argsort(self.voxel_n, kind="stable")
+            sorted_voxels = self.voxel_n[order]
+            is_first = np.empty(len(order), dtype=bool)
+            is_first[:1] = True
+            np.not_equal(sorted_voxels[1:], sorted_voxels[:-1], out=is_first[1:])
+            self._occupied = sorted_voxels[is_first]
+            self._occupied_inverse = np.empty(len(order), dtype=np.int64)
+            self._occupied_inverse[order] = np.cumsum(is_first) - 1
+            self._occupied_order = order
+        if return_inverse:
+            return self._occupied, self._occupied_inverse
+        return self._occupied
+
+    def find_occupied(self, voxels):
+        """Locate voxel indices inside get_occupied_voxels().
+
+        Returns
+        -------
+        positions: ndarray of int
+            Position of each voxel in the occupied array; -1 where empty.
+        """
+        occupied = self.get_occupied_voxels()
+        if not len(occupied):
+            return np.full(np.shape(voxels), -1, dtype=np.intp)
+        positions = np.searchsorted(occupied, voxels)
+        positions[positions == len(occupied)] = 0
+        positions[occupied[positions] != voxels] = -1
+        return positions
+
+    def get_voxel_adjacency(self):
+        """Pairs of non-empty voxels that touch in the 26-neighbourhood.
+
+        Returns
+        -------
+        src, dst: (E,) ndarray of int
+            Positions inside get_occupied_voxels(). Each undirected edge is
+            returned once.
+        """
+        occupied = self.get_occupied_voxels()
+        x, y, z = np.unravel_index(occupied, self.x_y_z)
+        src, dst = [], []
+        for dx, dy, dz in HALF_NEIGHBORHOOD:
+            n_x, n_y, n_z = x + dx, y + dy, z + dz
+            valid = ((n_x >= 0) & (n_x < self.x_y_z[0]) &
+                     (n_y >= 0) & (n_y < self.x_y_z[1]) &
+                     (n_z >= 0) & (n_z < self.x_y_z[2]))
+            valid = np.flatnonzero(valid)
+            neighbors = np.ravel_multi_index(
+                (n_x[valid], n_y[valid], n_z[valid]), self.x_y_z)
+            positions = self.find_occupied(neighbors)
+            found = positions >= 0
+            src.append(valid[found])
+            dst.append(positions[found])
+        return np.concatenate(src), np.concatenate(dst)
+
+    def get_voxel_clusters(self):
+        """Label connected groups of non-empty voxels (26-connectivity).
+
+        Returns
+        -------
+        n_clusters: int
+        labels: (M,) ndarray of int
+            Cluster of each voxel in get_occupied_voxels().
+        """
+        n_occupied = len(self.get_occupied_voxels())
+        src, dst = self.get_voxel_adjacency()
+        graph = coo_matrix((np.ones(len(src), dtype=np.int8), (src, dst)),
+                           shape=(n_occupied, n_occupied))
+        return connected_components(graph, directed=False)
 
     def get_voxel_neighbors(self, voxel):
         """Get valid, non-empty 26 neighbors of voxel.
@@ -236,37 +450,17 @@ class VoxelGrid(Structure):
         neighbors: list of int
             Indices of the valid, non-empty 26 neighborhood around voxel.
         """
-
         x, y, z = np.unravel_index(voxel, self.x_y_z)
+        offsets = cartesian(([-1, 0, 1], [-1, 0, 1], [-1, 0, 1]))
+        candidates = offsets + [x, y, z]
+        valid = np.all((candidates >= 0) & (candidates < self.x_y_z), axis=1)
+        candidates = candidates[valid]
+
+        ravel_indices = np.ravel_multi_index((candidates[:, 0],
+                                              candidates[:, 1],
+                                              candidates[:, 2]), self.x_y_z)
 
-        valid_x = []
-        valid_y = []
-        valid_z = []
-        if x - 1 >= 0:
-            valid_x.append(x - 1)
-        if y - 1 >= 0:
-            valid_y.append(y - 1)
-        if z - 1 >= 0:
-            valid_z.append(z - 1)
-
-        valid_x.append(x)
-        valid_y.append(y)
-        valid_z.append(z)
-
-        if x + 1 < self.x_y_z[0]:
-            valid_x.append(x + 1)
-        if y + 1 < self.x_y_z[1]:
-            valid_y.append(y + 1)
-        if z + 1 < self.x_y_z[2]:
-            valid_z.append(z + 1)
-
-        valid_neighbor_indices = cartesian((valid_x, valid_y, valid_z))
-
-        ravel_indices = np.ravel_multi_index((valid_neighbor_indices[:, 0],
-                                              valid_neighbor_indices[:, 1],
-                                              valid_neighbor_indices[:, 2]), self.x_y_z)
-
-        return [x for x in ravel_indices if x in np.unique(self.voxel_n)]
+        return ravel_indices[self.find_occupied(ravel_indices) >= 0].tolist()
 
     def plot(self,
              d=3,
@@ -1,3 +1,5 @@
+import numpy as np
+
 
 def convert_columns_dtype(df, old_dtype, new_dtype):
     """
@@ -16,3 +18,28 @@ def convert_columns_dtype(df, old_dtype, new_dtype):
             changed.append(column)
 
     return changed
+
+
+def cast_float_columns(df, dtype):
+    """
+    Parameters
+    ----------
+    df: pandas.DataFrame
+
+    dtype: numpy dtype or None
+        If None, df is returned as is.
+
+    Returns
+    -------
+    df: pandas.DataFrame
+        New DataFrame where only the float columns of other dtype were
+        converted; df itself is not modified.
+    """
+    if dtype is None:
+        return df
+    dtype = np.dtype(dtype)
+    changed = {column: dtype for column in df.columns
+               if df[column].dtype.kind == "f" and df[column].dtype != dtype}
+    if not changed:
+        return df
+    return df.astype(changed, copy=False)
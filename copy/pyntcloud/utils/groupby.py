@@ -0,0 +1,81 @@
+import numpy as np
+
+
+def group_starts(indices, order=None):
+    """
+    Parameters
+    ----------
+    indices: (N,) ndarray of int
+        Group of each value. Every group in [0, n) must be non-empty, as is
+        the case for the inverse returned by np.unique.
+    order: (N,) ndarray of int, optional
+        Stable argsort of indices, if already known.
+
+    Returns
+    -------
+    order: (N,) ndarray of int
+    starts: (n,) ndarray of int
+        Position in indices[order] where each group begins.
+    """
+    if order is None:
+        order = np.argsort(indices, kind="stable")
+    counts = np.bincount(indices)
+    starts = np.cumsum(counts) - counts
+    return order, starts
+
+
+def groupby_count(indices, n):
+    return np.bincount(indices, minlength=n)
+
+
+def groupby_sum(values, indices, n):
+    return np.bincount(indices, weights=values, minlength=n)
+
+
+def groupby_mean(values, indices, n):
+    return groupby_sum(values, indices, n) / groupby_count(indices, n)
+
+
+def groupby_std(values, indices, n):
+    """Population standard deviation; two passes to stay accurate with large coordinates."""
+    counts = groupby_count(indices, n)
+    mean = groupby_sum(values, indices, n) / counts
+    diffs = values - mean[indices]
+    return np.sqrt(groupby_sum(diffs * diffs, indices, n) / counts)
+
+
+def groupby_max(values, indices, order=None):
+    order, starts = group_starts(indices, order)
+    return np.maximum.reduceat(values[order], starts)
+
+
+def groupby_min(values, indices, order=None):
+    order, starts = group_starts(indices, order)
+    return np.minimum.reduceat(values[order], starts)
+
+
+def groupby_percentile(values, indices, q):
+    """
+    Parameters
+    ----------
+    values: (N,) ndarray
+    indices: (N,) ndarray of int
+        See group_starts.
+    q: float
+        Percentile in [0, 100]. Linear interpolation, as np.percentile.
+
+    Returns
+    -------
+    percentiles: (n,) ndarray of float
+    """
+    if not 0 <= q <= 100:
+        raise ValueError("Percentile must be in [0, 100]")
+    order = np.lexsort((values, indices))
+    sorted_values = values[order].astype(np.float64)
+    counts = np.bincount(indices)
+    starts = np.cumsum(counts) - counts
+    position = starts + (q / 100) * (counts - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    weight = position - low
+    return sorted_values[low] * (1 - weight) + sorted_values[high] * weight
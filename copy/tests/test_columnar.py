@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyntcloud import ColumnarCloud, PyntCloud
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    xyz = rng.random((500, 3)) * [10, 10, 2] + [500000, 2000000, 100]
+    return pd.DataFrame(xyz, columns=["x", "y", "z"])
+
+
+def test_offset_keeps_absolute_precision(points):
+    cloud = ColumnarCloud(points)
+    assert np.all(cloud.offset == [500000, 2000000, 100])
+    absolute = cloud.xyz.astype(np.float64) + cloud.offset
+    # float32 of the absolute values would be off by up to 0.125 m here
+    assert np.abs(absolute - points.values).max() < 1e-5
+
+
+def test_given_offset_is_kept(points):
+    cloud = ColumnarCloud(points - [500000, 2000000, 100], offset=[500000, 2000000, 100])
+    assert np.all(cloud.offset == [500000, 2000000, 100])
+    assert cloud.xyz.max() < 11
+    assert ColumnarCloud(points, offset=None).offset is None
+
+
+def test_get_neighbors(points):
+    cloud = ColumnarCloud(points)
+    expected = PyntCloud(points).get_neighbors(k=8)
+    assert np.array_equal(cloud.get_neighbors(k=8), expected)
+
+
+@pytest.mark.parametrize("name", ["eigen_values", "eigen_decomposition", "normals"])
+def test_k_neighbors_scalar_fields(points, name):
+    cloud = ColumnarCloud(points)
+    reference = PyntCloud(points)
+    k_neighbors = cloud.get_neighbors(k=10)
+    added = cloud.add_scalar_field(name, k_neighbors=k_neighbors)
+    expected = reference.add_scalar_field(name, k_neighbors=reference.get_neighbors(k=10))
+    assert added == expected
+    for column in np.atleast_1d(added):
+        values = cloud.points[column]
+        assert len(values) == len(points)
+        if name == "eigen_values":
+            assert np.allclose(values, reference.points[column], rtol=1e-3, atol=1e-6)
+
+
+def test_get_neighbors_on_filtered_view(points):
+    cloud = ColumnarCloud(points)
+    cloud.apply_filter(cloud.xyz[:, 0] < 5)
+    neighbors = cloud.get_neighbors(k=4)
+    assert neighbors.shape == (len(cloud), 4)
+    assert neighbors.max() < len(cloud)
+    cloud.add_scalar_field("eigen_values", k_neighbors=neighbors)
+    assert "e1(5)" in cloud.points
+
+
+@pytest.mark.parametrize("values, expected", [
+    (np.array([0, 10, 200], dtype=np.int64), [0, 10, 200]),
+    (np.array([0, 10, 200], dtype=np.uint16), [0, 0, 0]),
+    (np.array([0, 2560, 65535], dtype=np.uint16), [0, 10, 255]),
+])
+def test_colors_are_uint8(values, expected):
+    cloud = ColumnarCloud({"x": np.zeros(3), "y": np.zeros(3), "z": np.zeros(3),
+                           "red": values, "green": values, "blue": values})
+    assert cloud.points["red"].dtype == np.uint8
+    assert cloud.points["red"].tolist() == expected
+
+
+def test_out_of_range_colors_raise():
+    values = np.array([0, 300, 0])
+    with pytest.raises(ValueError):
+        ColumnarCloud({"x": np.zeros(3), "y": np.zeros(3), "z": np.zeros(3),
+                       "red": values, "green": values, "blue": values})
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyntcloud.io import pcd
+from pyntcloud.io.pcd import read_pcd, write_pcd
+
+
+def test_ascii_round_trip_is_exact(tmp_path):
+    rng = np.random.default_rng(0)
+    points = pd.DataFrame({"x": rng.random(1000, dtype=np.float32), "y": rng.random(1000, dtype=np.float32),
+                           "z": rng.random(1000, dtype=np.float32), "t": rng.random(1000) * 1e6})
+    filename = str(tmp_path / "cloud.pcd")
+    write_pcd(filename, points, data="ascii")
+    pd.testing.assert_frame_equal(read_pcd(filename)["points"], points)
+
+
+@pytest.mark.skipif(pcd.lzf is not None, reason="python-lzf is installed")
+def test_binary_compressed_needs_lzf(tmp_path):
+    points = pd.DataFrame({"x": np.zeros(3, dtype=np.float32), "y": np.zeros(3, dtype=np.float32),
+                           "z": np.zeros(3, dtype=np.float32)})
+    with pytest.raises(ImportError, match="python-lzf"):
+        write_pcd(str(tmp_path / "cloud.pcd"), points, data="binary_compressed")
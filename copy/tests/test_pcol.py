@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyntcloud.io.pcol import read_pcol, write_pcol
+
+
+def test_round_trip(tmp_path):
+    points = pd.DataFrame({"x": np.arange(10, dtype="f4"), "red": np.arange(10, dtype="u1")})
+    filename = str(tmp_path / "cloud.pcol")
+    write_pcol(filename, compression=None, points=points, offset=np.array([1.0, 2.0, 3.0]))
+    data = read_pcol(filename, mmap=False)
+    pd.testing.assert_frame_equal(data["points"], points)
+    assert np.array_equal(data["offset"], [1.0, 2.0, 3.0])
+
+
+def test_failed_overwrite_is_not_readable(tmp_path):
+    filename = str(tmp_path / "cloud.pcol")
+    write_pcol(filename, compression=None, points=pd.DataFrame({"x": np.arange(10, dtype="f4")}))
+    # object columns can't be written
+    with pytest.raises(Exception):
+        write_pcol(filename, compression=None, points=pd.DataFrame({"x": np.arange(5, dtype="f4"),
+                                                                   "name": ["a"] * 5}))
+    with pytest.raises(FileNotFoundError):
+        read_pcol(filename)
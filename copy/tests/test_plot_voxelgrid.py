@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from pyntcloud.plot import voxelgrid as plot_module
+from pyntcloud.structures.voxelgrid import VoxelGrid
+
+
+def build(sparse):
+    points = np.random.default_rng(0).random((1000, 3)) * 10
+    voxelgrid = VoxelGrid(points=points, n_x=8, n_y=8, n_z=8, sparse=sparse)
+    voxelgrid.compute()
+    return voxelgrid
+
+
+@pytest.fixture
+def plotted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(plot_module, "plot_voxelgrid_with_pythreejs",
+                        lambda centers, colors, **kwargs: calls.append((centers, colors)))
+    return calls
+
+
+def test_sparse_grid_plots_like_dense(plotted):
+    plot_module.plot_voxelgrid(build(sparse=False))
+    plot_module.plot_voxelgrid(build(sparse=True))
+    (dense_centers, dense_colors), (sparse_centers, sparse_colors) = plotted
+    assert np.array_equal(dense_centers, sparse_centers)
+    assert np.array_equal(dense_colors, sparse_colors)
+    assert len(sparse_centers) == len(sparse_colors)
+
+
+def test_sparse_grid_2d_plot_raises():
+    with pytest.raises(ValueError, match="dense"):
+        plot_module.plot_voxelgrid(build(sparse=True), d=2)
@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyntcloud.io.ply import read_ply, write_ply
+
+
+def points(**columns):
+    return pd.DataFrame(dict({"x": np.zeros(3, dtype="f4"), "y": np.zeros(3, dtype="f4"),
+                              "z": np.zeros(3, dtype="f4")}, **columns))
+
+
+@pytest.mark.parametrize("as_text", [False, True])
+def test_int64_in_range_is_written_as_int32(tmp_path, as_text):
+    filename = str(tmp_path / "cloud.ply")
+    write_ply(filename, points=points(id=np.array([0, -5, 2 ** 31 - 1])), as_text=as_text)
+    data = read_ply(filename)["points"]
+    assert data["id"].dtype == np.int32
+    assert data["id"].tolist() == [0, -5, 2 ** 31 - 1]
+
+
+@pytest.mark.parametrize("column", [np.array([0, 1, 2 ** 31]), np.array([0, 1, 2 ** 32], dtype=np.uint64)])
+def test_out_of_range_64_bit_integers_raise(tmp_path, column):
+    filename = str(tmp_path / "cloud.ply")
+    with pytest.raises(ValueError, match="id"):
+        write_ply(filename, points=points(id=column))
+    assert not os.path.exists(filename)
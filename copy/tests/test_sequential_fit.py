@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from pyntcloud import ColumnarCloud, PyntCloud
+
+
+def planes_cloud():
+    rng = np.random.default_rng(0)
+    n = 2000
+    xy = rng.random((n, 2)) * 10
+    floor = np.column_stack([xy, rng.normal(0, 1e-3, n)])
+    wall = np.column_stack([xy[:, 0], rng.normal(5, 1e-3, n), xy[:, 1]])
+    noise = rng.random((200, 3)) * 10
+    return pd.DataFrame(np.vstack([floor, wall, noise]), columns=["x", "y", "z"])
+
+
+def fit(cloud, random_state):
+    name = cloud.add_scalar_field("sequential_fit", max_dist=0.01, min_inliers=500,
+                                  random_state=random_state)
+    return cloud.points[name].copy(), cloud.fitted_models[name]
+
+
+def test_same_seed_gives_same_models():
+    labels, models = fit(PyntCloud(planes_cloud()), 42)
+    other_labels, other_models = fit(PyntCloud(planes_cloud()), 42)
+    assert np.array_equal(labels, other_labels)
+    assert len(models) == len(other_models) == 2
+    for model, other in zip(models, other_models):
+        assert np.array_equal(model.normal, other.normal)
+        assert np.array_equal(model.point, other.point)
+
+
+def test_fitted_models_on_columnar_cloud():
+    labels, models = fit(ColumnarCloud(planes_cloud(), offset=None), 0)
+    assert len(models) == 2
+    assert set(np.unique(labels)) == {-1, 0, 1}
@@ -0,0 +1,109 @@
+import numpy as np
+
+from layers import PointLayer
+
+
+class LayerState:
+    """Compact snapshot of the points of a layer.
+
+    Root layers are kept by reference. A subset is stored as a bitset over
+    its root (1 bit per root point) when its indices are sorted and that is
+    smaller than the indices themselves (4 bytes per point).
+    """
+
+    def __init__(self, points, params=None):
+        self.params = params or {}
+        self.root = None
+        self.indices = None
+        self.bits = None
+        self.stats = None
+        if points is None:
+            return
+        self.root = points.root
+        self.stats = points._stats
+        indices = points.indices
+        if indices is None:
+            return
+        n_root = len(points.root.points)
+        if n_root // 8 < indices.nbytes and np.all(indices[1:] > indices[:-1]):
+            mask = np.zeros(n_root, dtype=bool)
+            mask[indices] = True
+            self.bits = np.packbits(mask)
+        else:
+            self.indices = indices
+
+    @property
+    def nbytes(self):
+        if self.bits is not None:
+            return self.bits.nbytes
+        return 0 if self.indices is None else self.indices.nbytes
+
+    def restore(self):
+        """The PointLayer the snapshot was taken from, None for an empty layer."""
+        if self.root is None:
+            return None
+        indices = self.indices
+        if self.bits is not None:
+            indices = np.flatnonzero(np.unpackbits(self.bits, count=len(self.root.points)))
+        points = PointLayer(self.root, indices)
+        points._stats = self.stats
+        return points
+
+
+class History:
+    """Undo/redo stack of processing steps.
+
+    A step records, for every layer it changed, a LayerState before and
+    after it. Undo and redo swap those states back in, without running the
+    stage again.
+    """
+
+    def __init__(self, max_steps=20):
+        self.max_steps = max_steps
+        self._undo = []
+        self._redo = []
+
+    def push(self, label, before, after):
+        """Record a step.
+
+        Parameters
+        ----------
+        label: str
+        before, after: dict
+            Map each changed layer name to a LayerState.
+        """
+        self._undo.append((label, before, after))
+        del self._undo[:-self.max_steps]
+        self._redo = []
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        """dict of layer name: LayerState to restore, None if there is nothing to undo."""
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self._redo.append(step)
+        return step[1]
+
+    def redo(self):
+        """dict of layer name: LayerState to restore, None if there is nothing to redo."""
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self._undo.append(step)
+        return step[2]
+
+    def clear(self):
+        self._undo = []
+        self._redo = []
+
+    @property
+    def nbytes(self):
+        """Memory held by the index snapshots; roots are shared with the layers."""
+        return sum(state.nbytes for _, before, after in self._undo + self._redo
+                   for states in (before, after) for state in states.values())
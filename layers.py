@@ -0,0 +1,211 @@
+import numpy as np
+import open3d as o3d
+
+
+class LayerStats:
+    """Summary of the points of a layer.
+
+    Computed from one column of positions at a time, so a subset layer
+    never needs its (N, 3) positions gathered for it.
+    """
+
+    z_bins = 64
+
+    def __init__(self, columns, has_colors):
+        """
+        Parameters
+        ----------
+        columns: iterable of 3 (N,) ndarray
+            x, y and z of the points.
+        has_colors: bool
+        """
+        self.has_colors = has_colors
+        self.min = np.zeros(3)
+        self.max = np.zeros(3)
+        self.centroid = np.zeros(3)
+        self.count = 0
+        self.z_histogram = np.zeros(self.z_bins, dtype=np.int64)
+        self.z_edges = np.zeros(self.z_bins + 1)
+        for i, column in enumerate(columns):
+            self.count = len(column)
+            if not self.count:
+                return
+            self.min[i] = column.min()
+            self.max[i] = column.max()
+            self.centroid[i] = column.mean()
+            if i == 2:
+                self.z_histogram, self.z_edges = np.histogram(
+                    column, bins=self.z_bins, range=(self.min[2], self.max[2]))
+
+    def get_axis_aligned_bounding_box(self):
+        if not self.count:
+            return o3d.geometry.AxisAlignedBoundingBox()
+        return o3d.geometry.AxisAlignedBoundingBox(self.min, self.max)
+
+
+class PointLayer:
+    """Points of a layer, as positions in a shared root point cloud.
+
+    A root layer wraps an Open3D PointCloud: the source, or a cloud with
+    new points such as a voxel downsample. A subset layer (crop, ground,
+    ...) only stores the indices of its points in the root, so splitting
+    a layer costs 4 bytes per point instead of a full copy of positions,
+    colors and normals. The PointCloud of a subset is built by
+    get_geometry when it has to be rendered or written, and not kept.
+    """
+
+    def __init__(self, root, indices=None):
+        self.root = root
+        self.indices = None if indices is None else np.asarray(indices, dtype=np.uint32)
+        self._stats = None
+
+    def __len__(self):
+        if self.indices is None:
+            return len(self.root.points)
+        return len(self.indices)
+
+    def subset(self, indices):
+        """Layer with the points of this one at the given positions."""
+        indices = np.asarray(indices, dtype=np.intp)
+        if self.indices is not None:
+            indices = self.indices[indices]
+        return PointLayer(self.root, indices)
+
+    def _take(self, vector):
+        values = np.asarray(vector)
+        return values if self.indices is None else values[self.indices]
+
+    @property
+    def points(self):
+        """(N, 3) float64 positions; a view of the root buffer for root layers."""
+        return self._take(self.root.points)
+
+    @property
+    def colors(self):
+        return self._take(self.root.colors)
+
+    @property
+    def normals(self):
+        return self._take(self.root.normals)
+
+    def _columns(self):
+        points = np.asarray(self.root.points)
+        for i in range(3):
+            column = points[:, i]
+            yield column if self.indices is None else column[self.indices]
+
+    @property
+    def stats(self):
+        """LayerStats, computed once; a layer's points never change."""
+        if self._stats is None:
+            self._stats = LayerStats(self._columns(), self.has_colors())
+        return self._stats
+
+    def has_colors(self):
+        return self.root.has_colors()
+
+    def has_normals(self):
+        return self.root.has_normals()
+
+    def get_geometry(self):
+        """Open3D PointCloud of the layer; the root itself for root layers."""
+        if self.indices is None:
+            return self.root
+        geometry = o3d.geometry.PointCloud()
+        points = self.points
+        if self._stats is None:
+            # while the positions are gathered anyway
+            self._stats = LayerStats(points.T, self.has_colors())
+        geometry.points = o3d.utility.Vector3dVector(points)
+        if self.has_colors():
+            geometry.colors = o3d.utility.Vector3dVector(self.colors)
+        if self.has_normals():
+            geometry.normals = o3d.utility.Vector3dVector(self.normals)
+        return geometry
+
+    def get_axis_aligned_bounding_box(self):
+        return self.stats.get_axis_aligned_bounding_box()
+
+
+class Layer:
+    """Entry of a LayerRegistry: named points shown in the scene.
+
+    The point count and the bounding box come from the LayerStats of the
+    points, computed once per set_points, not on every redraw or
+    visibility change.
+    """
+
+    def __init__(self, name, label):
+        self.name = name
+        self.label = label
+        self.geometry_name = "__{}__".format(name)
+        self.bound_name = "__{}_bounds__".format(name)
+        self.visible = True
+        self.points = None
+        self.params = {}
+        self.count = 0
+        self._bounds = None
+
+    def set_points(self, points, params=None):
+        """Replace the PointLayer of this layer; None empties it.
+
+        params are the parameters of the stage that produced the points.
+        """
+        self.points = points
+        self.params = params or {}
+        self.count = 0 if points is None else len(points)
+        self._bounds = None
+
+    @property
+    def stats(self):
+        return None if self.points is None else self.points.stats
+
+    @property
+    def bounds(self):
+        if self._bounds is None and self.points is not None:
+            self._bounds = self.points.get_axis_aligned_bounding_box()
+            self._bounds.color = (1, 0, 0)
+        return self._bounds
+
+
+class LayerRegistry:
+    """Ordered collection of the layers of a window."""
+
+    def __init__(self):
+        self._layers = {}
+
+    def add(self, name, label):
+        layer = Layer(name, label)
+        self._layers[name] = layer
+        return layer
+
+    def __getitem__(self, name):
+        return self._layers[name]
+
+    def __contains__(self, name):
+        return name in self._layers
+
+    def __iter__(self):
+        return iter(self._layers.values())
+
+    def get_selected(self, names=None):
+        """First visible layer among names, the last one if none is visible.
+
+        Parameters
+        ----------
+        names: list of str, optional
+            Default: None, all layers in order.
+        """
+        layers = [self._layers[name] for name in names] if names else list(self._layers.values())
+        for layer in layers:
+            if layer.visible:
+                return layer
+        return layers[-1]
+
+    def count_visible(self):
+        return sum(layer.visible for layer in self._layers.values())
+
+    def reset(self):
+        for layer in self._layers.values():
+            layer.set_points(None)
+            layer.visible = True
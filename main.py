@@ -12,6 +12,11 @@ import pylas
 import subprocess
 import pathlib
 import CSF
+from scipy.spatial import cKDTree
+from history import History, LayerState
+from layers import LayerRegistry, PointLayer
+from session import Session, WORKSPACE_DIR
+from tasks import TaskScheduler
 
 if platform.system() == "Darwin":
     serif = "Arial"
@@ -82,33 +87,37 @@ class AppWindow:
     MENU_CLOSE_ALL = 6
     MENU_CROP_GEOMETRY = 7
     CSF_FILTER = 8
-
-    SOURCE = "__model__"
-    SOURCE_BOUND = "__m_bounds__"
-    DOWNSAMPLE = "__downsample__"
-    DOWNSAMPLE_BOUND = "__d_bounds__"
-    CROP = "__cropped__"
-    CROP_BOUND = "__c_bounds__"
-    SUB = "__sub__"
-    SUB_BOUND = "__s_bounds__"
-    GROUND = "__ground__"
-    GROUND_BOUND = "__g_bounds__"
-    NON_GROUND = "__non_ground__"
-    NON_GROUND_BOUND = "__ng_bounds__"
+    MENU_OPEN_SESSION = 9
+    MENU_UNDO = 12
+    MENU_REDO = 13
+
+    # (name, checkbox label) of the layers, in panel order
+    LAYERS = [
+        ("source", "Gốc"),
+        ("downsample", "Giảm mẫu"),
+        ("crop", "Cắt"),
+        ("sub", "Phần bù"),
+        ("ground", "Địa hình"),
+        ("non_ground", "Không phải địa hình"),
+    ]
+    # hidden layers with more points are removed from the scene, not hidden
+    LARGE_LAYER = 6e6
+    # points processed by a task between two progress reports
+    CHUNK_SIZE = 1 << 20
+    # points of the sample shown while a LAS file is read
+    PREVIEW_POINTS = 1 << 20
+    PREVIEW_GEOMETRY = "__preview__"
 
     DEFAULT_IBL = "default"
 
     # Config values
-    _checkeds = [True, True, True, True, True, True]
-    _geometry = None
-    _d_geometry = None
-    _c_geometry = None
-    _s_geometry = None
-    _g_geometry = None
-    _ng_geometry = None
     _downsampling = 0.0
     _path = None
     _infile = None
+    # origin the loaded coordinates are relative to (see read_las)
+    _offset = None
+    # workspace session of the loaded file, saved as the layers change
+    _session = None
     _slope_processing = False
     _cloth_resolution = 2.0
     _max_interations = 500
@@ -142,63 +151,45 @@ class AppWindow:
 
         db_ctrls = gui.CollapsableVert("Dữ liệu", 0.25 * em, gui.Margins(em, 0, 0, 0))
 
-        main_layout = gui.Horiz()
-        crop_layout = gui.Horiz()
-        downsample_layout = gui.Horiz()
-        sub_layout = gui.Horiz()
-        ground_layout = gui.Horiz()
-        non_ground_layout = gui.Horiz()
-        self._fileedit_2 = gui.Checkbox("Gốc")
-        self._fileedit_3 = gui.Checkbox("Cắt")
-        self._fileedit_4 = gui.Checkbox("Giảm mẫu")
-        self._fileedit_5 = gui.Checkbox("Phần bù")
-        self._fileedit_6 = gui.Checkbox("Địa hình")
-        self._fileedit_7 = gui.Checkbox("Không phải địa hình")
-        self._fileedit_2.checked = True
-        self._fileedit_3.checked = True
-        self._fileedit_4.checked = True
-        self._fileedit_5.checked = True
-        self._fileedit_6.checked = True
-        self._fileedit_7.checked = True
-
-        self._fileedit_2.set_on_checked(self._on_db_main_checked)
-        self._fileedit_3.set_on_checked(self._on_db_crop_checked)
-        self._fileedit_4.set_on_checked(self._on_db_downsample_checked)
-        self._fileedit_5.set_on_checked(self._on_db_sub_checked)
-        self._fileedit_6.set_on_checked(self._on_db_ground_checked)
-        self._fileedit_7.set_on_checked(self._on_db_non_ground_checked)
-
-        self._fileedit_main = gui.Label("")
-
-        self._fileedit_crop = gui.Label("")
-        self._fileedit_downsample = gui.Label("")
-        self._fileedit_sub = gui.Label("")
-        self._fileedit_ground = gui.Label("")
-        self._fileedit_non_ground = gui.Label("")
-
-        main_layout.add_child(self._fileedit_2)
-        main_layout.add_fixed(0.25 * em)
-        main_layout.add_child(self._fileedit_main)
-
-        downsample_layout.add_child(self._fileedit_4)
-        downsample_layout.add_fixed(0.25 * em)
-        downsample_layout.add_child(self._fileedit_downsample)
-
-        crop_layout.add_child(self._fileedit_3)
-        crop_layout.add_fixed(0.25 * em)
-        crop_layout.add_child(self._fileedit_crop)
-
-        sub_layout.add_child(self._fileedit_5)
-        sub_layout.add_fixed(0.25 * em)
-        sub_layout.add_child(self._fileedit_sub)
-
-        ground_layout.add_child(self._fileedit_6)
-        ground_layout.add_fixed(0.25 * em)
-        ground_layout.add_child(self._fileedit_ground)
-
-        non_ground_layout.add_child(self._fileedit_7)
-        non_ground_layout.add_fixed(0.25 * em)
-        non_ground_layout.add_child(self._fileedit_non_ground)
+        # layers.LayerRegistry; the points of each layer are a
+        # layers.PointLayer, subsets being indices into the source or the
+        # downsample, only materialized to render or write
+        self._layers = LayerRegistry()
+        # undo/redo of the processing steps, see _apply_step
+        self._history = History()
+        self._layer_checkboxes = {}
+        self._layer_labels = {}
+        for name, label in AppWindow.LAYERS:
+            self._layers.add(name, label)
+            checkbox = gui.Checkbox(label)
+            checkbox.checked = True
+            checkbox.set_on_checked(lambda state, name=name: self._on_layer_checked(name, state))
+            self._layer_checkboxes[name] = checkbox
+            self._layer_labels[name] = gui.Label("")
+            layout = gui.Horiz()
+            layout.add_child(checkbox)
+            layout.add_fixed(0.25 * em)
+            layout.add_child(self._layer_labels[name])
+            db_ctrls.add_child(layout)
+
+        # heavy stages run on worker threads, with their progress shown here
+        self._tasks = TaskScheduler(
+            lambda callback: gui.Application.instance.post_to_main_thread(self.window, callback),
+            self._on_task_error, on_changed=self._on_tasks_changed)
+        self._task_label = gui.Label("")
+        self._task_progress = gui.ProgressBar()
+        self._task_cancel = gui.Button("Hủy")
+        self._task_cancel.horizontal_padding_em = 0.5
+        self._task_cancel.vertical_padding_em = 0
+        self._task_cancel.enabled = False
+        self._task_cancel.set_on_clicked(self._on_task_cancel)
+        db_ctrls.add_fixed(separation_height)
+        db_ctrls.add_child(self._task_label)
+        db_ctrls.add_child(self._task_progress)
+        h = gui.Horiz()
+        h.add_stretch()
+        h.add_child(self._task_cancel)
+        db_ctrls.add_child(h)
 
         self._fileedit = gui.TextEdit()
         filedlgbutton = gui.Button("...")
@@ -206,12 +197,6 @@ class AppWindow:
         filedlgbutton.vertical_padding_em = 0
         filedlgbutton.set_on_clicked(self._on_filedlg_button)
 
-        db_ctrls.add_child(main_layout)
-        db_ctrls.add_child(downsample_layout)
-        db_ctrls.add_child(crop_layout)
-        db_ctrls.add_child(sub_layout)
-        db_ctrls.add_child(ground_layout)
-        db_ctrls.add_child(non_ground_layout)
         db_ctrls.add_fixed(separation_height)
 
         self._settings_panel.add_child(db_ctrls)
@@ -308,6 +293,10 @@ class AppWindow:
                 app_menu.add_item("Quit", AppWindow.MENU_QUIT)
             file_menu = gui.Menu()
             file_menu.add_item("Mở file...", AppWindow.MENU_OPEN)
+            file_menu.add_item("Mở phiên làm việc...", AppWindow.MENU_OPEN_SESSION)
+            file_menu.add_separator()
+            file_menu.add_item("Hoàn tác", AppWindow.MENU_UNDO)
+            file_menu.add_item("Làm lại", AppWindow.MENU_REDO)
             file_menu.add_separator()
             file_menu.add_item("Giảm mật độ PointCloud", AppWindow.MENU_DOWNSAMPLING)
             file_menu.add_item("Cắt", AppWindow.MENU_CROP_GEOMETRY)
@@ -334,6 +323,9 @@ class AppWindow:
             gui.Application.instance.menubar = menu
 
         w.set_on_menu_item_activated(AppWindow.MENU_OPEN, self._on_menu_open)
+        w.set_on_menu_item_activated(AppWindow.MENU_OPEN_SESSION, self._on_menu_open_session)
+        w.set_on_menu_item_activated(AppWindow.MENU_UNDO, self._on_menu_undo)
+        w.set_on_menu_item_activated(AppWindow.MENU_REDO, self._on_menu_redo)
         w.set_on_menu_item_activated(
             AppWindow.MENU_DOWNSAMPLING, self._on_menu_downsampling
         )
@@ -355,6 +347,7 @@ class AppWindow:
         # ----
 
         self._apply_settings()
+        self._update_history_menu()
 
     def _apply_settings(self):
         bg_color = [
@@ -404,50 +397,137 @@ class AppWindow:
             self._scene.frame = gui.Rect(width, 25, r.width - width, r.height)
             self._settings_panel.frame = gui.Rect(0, 25, width, r.height)
 
-    def _on_db_main_checked(self, state):
-        self._checkeds[0] = state
-        len_geo = len(self._geometry.points)
-        if len_geo > 6e6:
-            self._scene.scene.show_geometry(AppWindow.SOURCE_BOUND, state)
+    def _on_layer_checked(self, name, state):
+        layer = self._layers[name]
+        layer.visible = state
+        if layer.points is None:
+            return
+        if layer.count > AppWindow.LARGE_LAYER:
             if state:
-                if self._geometry is not None:
-                    self._scene.scene.add_geometry(AppWindow.SOURCE, self._geometry, self.settings.material)
+                self._scene.scene.add_geometry(layer.geometry_name, layer.points.get_geometry(),
+                                               self.settings.material)
             else:
-                self._scene.scene.remove_geometry(AppWindow.SOURCE)
+                self._scene.scene.remove_geometry(layer.geometry_name)
+        else:
+            self._scene.scene.show_geometry(layer.geometry_name, state)
+        self._scene.scene.show_geometry(layer.bound_name, state)
+
+    def _set_layer(self, name, points, params=None):
+        """Replace the points of a layer and update the scene and the panel.
+
+        Parameters
+        ----------
+        name: str
+        points: layers.PointLayer or None
+            None empties the layer.
+        params: dict, optional
+            Parameters of the stage that produced the points.
+        """
+        layer = self._layers[name]
+        self._scene.scene.remove_geometry(layer.geometry_name)
+        self._scene.scene.remove_geometry(layer.bound_name)
+        layer.set_points(points, params)
+        if points is None:
+            self._layer_labels[name].text = ""
+            return
+        if layer.visible or layer.count <= AppWindow.LARGE_LAYER:
+            self._scene.scene.add_geometry(layer.geometry_name, points.get_geometry(), self.settings.material)
+            self._scene.scene.show_geometry(layer.geometry_name, layer.visible)
+        self._scene.scene.add_geometry(layer.bound_name, layer.bounds, self.settings.material)
+        self._scene.scene.show_geometry(layer.bound_name, layer.visible)
+        self._layer_labels[name].text = "({0} điểm)".format(layer.count)
+
+    def _apply_step(self, label, layers, params=None):
+        """Set layers as one undoable step and record them in the session.
+
+        Parameters
+        ----------
+        label: str
+        layers: dict
+            Map layer names to their new layers.PointLayer or None.
+        params: dict, optional
+            Parameters of the stage.
+        """
+        before = {name: LayerState(self._layers[name].points, self._layers[name].params) for name in layers}
+        for name, points in layers.items():
+            self._set_layer(name, points, params)
+            self._save_session_layer(name)
+        after = {name: LayerState(self._layers[name].points, self._layers[name].params) for name in layers}
+        self._history.push(label, before, after)
+        self._update_history_menu()
+
+    def _restore_layer_states(self, states):
+        # the states replace the result of any task still running on them
+        self._tasks.cancel(states)
+        for name, state in states.items():
+            self._set_layer(name, state.restore(), state.params)
+            self._save_session_layer(name)
+        self._update_history_menu()
+
+    def _on_menu_undo(self):
+        states = self._history.undo()
+        if states is not None:
+            self._restore_layer_states(states)
+
+    def _on_menu_redo(self):
+        states = self._history.redo()
+        if states is not None:
+            self._restore_layer_states(states)
+
+    def _update_history_menu(self):
+        menubar = gui.Application.instance.menubar
+        if menubar is not None:
+            menubar.set_enabled(AppWindow.MENU_UNDO, self._history.can_undo())
+            menubar.set_enabled(AppWindow.MENU_REDO, self._history.can_redo())
+
+    def _on_tasks_changed(self, tasks):
+        if tasks:
+            task = tasks[-1]
+            text = "{0}: {1}".format(task.label, task.text) if task.text else task.label
+            if len(tasks) > 1:
+                text += " (+{0})".format(len(tasks) - 1)
+            self._task_label.text = text
+            self._task_progress.value = task.progress
         else:
-            if self._geometry is not None:
-                self._scene.scene.show_geometry(AppWindow.SOURCE_BOUND, state)
-                self._scene.scene.show_geometry(AppWindow.SOURCE, state)
-
-    def _on_db_downsample_checked(self, state):
-        self._checkeds[1] = state
-        if self._d_geometry is not None:
-            self._scene.scene.show_geometry(AppWindow.DOWNSAMPLE, state)
-            self._scene.scene.show_geometry(AppWindow.DOWNSAMPLE_BOUND, state)
-
-    def _on_db_sub_checked(self, state):
-        self._checkeds[3] = state
-        if self._s_geometry is not None:
-            self._scene.scene.show_geometry(AppWindow.SUB, state)
-            self._scene.scene.show_geometry(AppWindow.SUB_BOUND, state)
-
-    def _on_db_ground_checked(self, state):
-        self._checkeds[4] = state
-        if self._g_geometry is not None:
-            self._scene.scene.show_geometry(AppWindow.GROUND, state)
-            self._scene.scene.show_geometry(AppWindow.GROUND_BOUND, state)
-
-    def _on_db_non_ground_checked(self, state):
-        self._checkeds[5] = state
-        if self._ng_geometry is not None:
-            self._scene.scene.show_geometry(AppWindow.NON_GROUND, state)
-            self._scene.scene.show_geometry(AppWindow.NON_GROUND_BOUND, state)
-
-    def _on_db_crop_checked(self, state):
-        self._checkeds[2] = state
-        if self._c_geometry is not None:
-            self._scene.scene.show_geometry(AppWindow.CROP, state)
-            self._scene.scene.show_geometry(AppWindow.CROP_BOUND, state)
+            self._task_label.text = ""
+            self._task_progress.value = 0.0
+        self._task_cancel.enabled = any(task.cancellable for task in tasks)
+
+    def _on_task_cancel(self):
+        # downsample and CSF run as one native call and can't be interrupted
+        self._tasks.cancel_tasks([task for task in self._tasks.tasks if task.cancellable])
+
+    def _on_task_error(self, task, e):
+        # the packaged app has no console: errors are shown in the window
+        self.window.show_message_box("Chú ý", "{0}: lỗi {1}".format(task.label, e))
+
+    def _save_session_layer(self, name):
+        """Write the current state of a layer to the session, on a worker thread.
+
+        The state is taken now; the writes run one after the other, in the
+        order they were made.
+        """
+        session = self._session
+        if session is None:
+            return
+        layer = self._layers[name]
+        params = layer.params
+        if layer.points is None:
+            write = lambda: session.remove_layer(name)
+        elif layer.points.indices is None:
+            # a root with new points, rebuilt from its parameters
+            write = lambda: session.save_layer(name, "source", params)
+        else:
+            # indices of a subset are relative to its root, the source or the downsample
+            roots = [root for root in (self._layers["source"], self._layers["downsample"])
+                     if root.points is not None and root.points.root is layer.points.root]
+            if roots:
+                parent, indices = roots[0].name, layer.points.indices
+                write = lambda: session.save_layers(parent, {name: indices}, params)
+            else:
+                write = lambda: session.remove_layer(name)
+        self._tasks.submit("Lưu phiên làm việc", ["session"], lambda task: write(), lambda result: None,
+                           cancellable=False, wait=True)
 
     def _on_filedlg_button(self):
         filedlg = gui.FileDialog(gui.FileDialog.OPEN, "Chọn tệp tin", self.window.theme)
@@ -460,57 +540,34 @@ class AppWindow:
         self.window.close_dialog()
 
     def _on_filedlg_done(self, path):
-        pcd = None
-        if self._checkeds[0]:
-            pcd = self._geometry
-        elif self._checkeds[1]:
-            pcd = self._d_geometry
-        elif self._checkeds[2]:
-            pcd = self._c_geometry
-        elif self._checkeds[3]:
-            pcd = self._s_geometry
-        elif self._checkeds[4]:
-            pcd = self._g_geometry
-        else:
-            pcd = self._ng_geometry
+        self.window.close_dialog()
+        pcd = self._layers.get_selected().points
 
         if pcd is not None:
-            c_pcd = o3d.io.read_point_cloud(path)
-            dists = pcd.compute_point_cloud_distance(c_pcd)
-            dists = np.asarray(dists)
-            ind = np.where(dists > 0.01)[0]
-            pcd_without_cropped = pcd.select_by_index(ind)
-            # Add cropped geo to scene
-            self._scene.scene.remove_geometry(AppWindow.CROP)
-            self._scene.scene.remove_geometry(AppWindow.CROP_BOUND)
-            self._fileedit_sub.text = "({0} điểm)".format(len(c_pcd.points))
-            c_bounds = c_pcd.get_axis_aligned_bounding_box()
-            c_bounds.color = (1, 0, 0)
-            self._scene.scene.add_geometry(AppWindow.CROP, c_pcd, self.settings.material)
-            self._scene.scene.add_geometry(AppWindow.CROP_BOUND, c_bounds, self.settings.material)
-            self._scene.scene.show_geometry(AppWindow.CROP, self._checkeds[2])
-            self._scene.scene.show_geometry(AppWindow.CROP_BOUND, self._checkeds[2])
-            # Add sub geo to scene
-            self._scene.scene.remove_geometry(AppWindow.SUB)
-            self._scene.scene.remove_geometry(AppWindow.SUB_BOUND)
-           
-            self._fileedit_sub.text = "({0} điểm)".format(len(pcd_without_cropped.points))
-            s_bounds = pcd_without_cropped.get_axis_aligned_bounding_box()
-            s_bounds.color = (1, 0, 0)
-            self._scene.scene.add_geometry(
-                AppWindow.SUB, pcd_without_cropped, self.settings.material
-            )
-            self._scene.scene.add_geometry(AppWindow.SUB_BOUND, s_bounds, self.settings.material)
-            self._scene.scene.show_geometry(AppWindow.SUB, self._checkeds[3])
-            self._scene.scene.show_geometry(AppWindow.SUB_BOUND, self._checkeds[3])
-            self._c_geometry = c_pcd
-            self._s_geometry = pcd_without_cropped
-            self._fileedit_crop.text = "({0} điểm)".format(len(c_pcd.points))
-            self._fileedit_sub.text = "({0} điểm)".format(len(pcd_without_cropped.points))
+            self._tasks.submit("Cắt", ["crop", "sub"], lambda task: self._crop(task, pcd, path), self._on_cropped)
+
+    def _crop(self, task, pcd, path, start=0.0):
+        """Split pcd into the points of the cloud at path and the others; runs on a worker thread."""
+        # one tree for every chunk; the chunks only report progress and check for cancellation
+        kdtree = cKDTree(np.asarray(o3d.io.read_point_cloud(path).points))
+        points = pcd.points
+        is_cropped = np.empty(len(points), dtype=bool)
+        for begin, end in task.chunks(len(points), AppWindow.CHUNK_SIZE, start, 0.9, "so khớp điểm"):
+            # the bound is exclusive: within 0.01 included, farther points get inf
+            dists, _ = kdtree.query(points[begin:end], distance_upper_bound=np.nextafter(0.01, np.inf), workers=-1)
+            is_cropped[begin:end] = np.isfinite(dists)
+        del kdtree
+        # both sides of the crop are points of pcd
+        layers = {"crop": pcd.subset(np.flatnonzero(is_cropped)), "sub": pcd.subset(np.flatnonzero(~is_cropped))}
+        task.report(0.9, "thống kê")
+        for points in layers.values():
+            points.stats
+        return layers
+
+    def _on_cropped(self, layers):
+        if layers is not None:
+            self._apply_step("crop", layers)
 
-        self.window.close_dialog()
-
-        
     def _set_mouse_mode_rotate(self):
         self._scene.set_view_controls(gui.SceneWidget.Controls.ROTATE_CAMERA)
 
@@ -578,79 +635,59 @@ class AppWindow:
         self.load(filename)
 
     def _on_menu_close_all(self):
+        # the pending session writes still land
+        self._tasks.cancel_tasks([task for task in self._tasks.tasks if "session" not in task.keys])
         self.window.title = "PointCloud"
         self._scene.scene.clear_geometry()
-        self._fileedit_main.text = ""
-        self._fileedit_downsample.text = ""
-        self._fileedit_crop.text = ""
-        self._fileedit_sub.text = ""
-        self._fileedit_ground.text = ""
-        self._fileedit_non_ground.text = ""
-        self._geometry = None
-        self._d_geometry = None
-        self._c_geometry = None
-        self._s_geometry = None
-        self._g_geometry = None
-        self._ng_geometry = None
-        self._checkeds = [True, True, True, True, True, True]
-        self._fileedit_2.checked = True
-        self._fileedit_3.checked = True
-        self._fileedit_4.checked = True
-        self._fileedit_5.checked = True
-        self._fileedit_6.checked = True
-        self._fileedit_7.checked = True
+        self._layers.reset()
+        for layer in self._layers:
+            self._layer_labels[layer.name].text = ""
+            self._layer_checkboxes[layer.name].checked = True
         self._infile = None
-
+        self._offset = None
+        self._session = None
+        self._history.clear()
+        self._update_history_menu()
 
     def _on_menu_crop_geometry(self):
 
-        c_geometry = None
-        if self._checkeds[0]:
-            c_geometry = self._geometry
-        elif self._checkeds[1]:
-            c_geometry = self._d_geometry
-        elif self._checkeds[2]:
-            c_geometry = self._c_geometry
-        elif self._checkeds[3]:
-            c_geometry = self._s_geometry
-        elif self._checkeds[4]:
-            c_geometry = self._g_geometry
-        else:
-            c_geometry = self._ng_geometry
-
-        print(self._checkeds)
+        c_geometry = self._layers.get_selected().points
 
         if c_geometry is not None:
-            dir_path = r"C:\Program Files\PP"
-            tmp = os.path.join(dir_path,"tmp.pcd") 
-            s_tmp = os.path.join(dir_path,"crop_geometry.exe") 
-            print(tmp)
-            print(s_tmp)
-            o3d.io.write_point_cloud(tmp, c_geometry)
-            sub_result = subprocess.Popen(
-            s_tmp, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.PIPE)
-            sub_result.wait()
-            out, err = sub_result.communicate()
-            return_code = sub_result.returncode
-            print(return_code)
-            print(out)
-            if return_code == 0:
-                if out.splitlines()[0] == b'True':
-                    save_path = os.path.join(dir_path,"c_geo.pcd") 
-                    self._on_filedlg_done(save_path)
-                else:
-                    self._fileedit_crop.text = ""
-                    self._fileedit_sub.text = ""
-                    if self._s_geometry is not None:
-                        self._scene.scene.remove_geometry(AppWindow.SUB)
-                        self._scene.scene.remove_geometry(AppWindow.SUB_BOUND)
-                    if self._c_geometry is not None:
-                        self._scene.scene.remove_geometry(AppWindow.CROP)
-                        self._scene.scene.remove_geometry(AppWindow.CROP_BOUND)
+            self._tasks.submit("Cắt", ["crop", "sub"], lambda task: self._crop_geometry(task, c_geometry),
+                               self._on_cropped)
+
+    def _crop_geometry(self, task, c_geometry):
+        """Crop c_geometry with the external crop tool; runs on a worker thread.
+
+        Returns the crop layers, None if the tool failed.
+        """
+        dir_path = r"C:\Program Files\PP"
+        tmp = os.path.join(dir_path,"tmp.pcd") 
+        s_tmp = os.path.join(dir_path,"crop_geometry.exe") 
+        task.report(0.0, "ghi file")
+        o3d.io.write_point_cloud(tmp, c_geometry.get_geometry())
+        task.report(0.1, "chờ công cụ cắt")
+        sub_result = subprocess.Popen(
+        s_tmp, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.PIPE)
+        while True:
+            try:
+                out, err = sub_result.communicate(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                if task.token.cancelled:
+                    sub_result.kill()
+                    task.check()
+        return_code = sub_result.returncode
+        if return_code != 0:
+            return None
+        if out.splitlines()[0] == b'True':
+            save_path = os.path.join(dir_path,"c_geo.pcd") 
+            return self._crop(task, c_geometry, save_path, 0.5)
+        return {"crop": None, "sub": None}
 
     def _on_menu_export_las(self):
-        len_true = np.sum(self._checkeds)
-        if len_true != 1:
+        if self._layers.count_visible() != 1:
             self.window.show_message_box("Chú ý", "Chỉ chọn một PointCloud để xuất dữ liệu")
         else:
             dlg = gui.FileDialog(
@@ -672,38 +709,51 @@ class AppWindow:
 
     def _on_export_las_dialog_done(self, filename):
         self.window.close_dialog()
-        e_geometry = None
-        if self._checkeds[0]:
-            e_geometry = self._geometry
-        elif self._checkeds[1]:
-            e_geometry = self._d_geometry
-        elif self._checkeds[2]:
-            e_geometry = self._c_geometry
-        elif self._checkeds[3]:
-            e_geometry = self._s_geometry
-        elif self._checkeds[4]:
-            e_geometry = self._g_geometry
-        else:
-            e_geometry = self._ng_geometry
+        e_geometry = self._layers.get_selected().points
 
-        las = pylas.create(point_format_id=self._infile.point_format.id)
-        las.header = self._infile.header
-        scales = self._infile.header.scales
-        pcd_points = np.asarray(e_geometry.points)
+        if e_geometry is not None:
+            infile, path, offset = self._infile, self._path, self._offset
+            self._tasks.submit("Xuất file .las", ["export"],
+                               lambda task: self._write_las(task, filename, e_geometry, infile, path, offset),
+                               self._on_las_written)
+
+    def _write_las(self, task, filename, e_geometry, infile, path, offset):
+        """Write e_geometry with the point format of the source; runs on a worker thread.
+
+        Returns filename and the source LasData, read from path if infile is None.
+        """
+        if infile is None:
+            # memory mapped sources and sessions restored from the cache
+            # have no LasData
+            task.report(0.0, "đọc file gốc")
+            infile = pylas.read(path)
+        las = pylas.create(point_format_id=infile.point_format.id)
+        las.header = infile.header
+        scales = np.asarray(infile.header.scales)
+        # back to the header's integer grid: points are relative to
+        # offset, the raw integers to header.offsets
+        shift = offset - np.asarray(infile.header.offsets)
+        pcd_points = e_geometry.points
         len_shape = len(pcd_points)
-        reshape_points = np.reshape(pcd_points.T, (3, len_shape))
-        las.__setitem__("X", reshape_points[0] / scales[0])
-        las.__setitem__("Y", reshape_points[1] / scales[1])
-        las.__setitem__("Z", reshape_points[2] / scales[2])
+        reshape_points = np.empty((3, len_shape))
+        for begin, end in task.chunks(len_shape, AppWindow.CHUNK_SIZE, 0.1, 0.7, "chuyển đổi"):
+            reshape_points[:, begin:end] = np.round((pcd_points[begin:end] + shift) / scales).T
+        las.__setitem__("X", reshape_points[0])
+        las.__setitem__("Y", reshape_points[1])
+        las.__setitem__("Z", reshape_points[2])
 
         if e_geometry.has_colors():
-            pcd_colors = np.asarray(e_geometry.colors)
-            reshape_colors = np.reshape(pcd_colors.T, (3, len_shape))
+            reshape_colors = e_geometry.colors.T
             las.__setattr__("red", reshape_colors[0] * 65025)#65536
             las.__setattr__("green", reshape_colors[1] * 65025)
             las.__setattr__("blue", reshape_colors[2] * 65025)
 
+        task.report(0.8, "ghi file")
         las.write(filename)
+        return filename, infile
+
+    def _on_las_written(self, result):
+        filename, self._infile = result
         self._on_export_las_success(filename)
 
     def _on_export_las_success(self, filename):
@@ -832,56 +882,53 @@ class AppWindow:
 
     def _on_aply_csf(self):
         self.window.close_dialog()
-        e_geometry = None
-        if self._checkeds[0]:
-            e_geometry = self._geometry
-        elif self._checkeds[1]:
-            e_geometry = self._d_geometry
-        elif self._checkeds[2]:
-            e_geometry = self._c_geometry
-        else:
-            e_geometry = self._s_geometry
+        layer = self._layers.get_selected(["source", "downsample", "crop", "sub"])
+        e_geometry = layer.points
         if e_geometry is not None:
-            csf = CSF.CSF()
-            # prameter settings
-            csf.params.bSloopSmooth = self._slope_processing
-            csf.params.cloth_resolution = self._cloth_resolution
-            csf.params.rigidness = int(np.where(self._rigidness==True)[0][0]+1)
-            csf.params.class_threshold = self._classification_threshold
-            print(self._max_interations)
-            csf.params.interations = int(self._max_interations)
-            points = np.asarray(e_geometry.points)
-            colors = np.asarray(e_geometry.colors)
-            csf.setPointCloud(points)
-            ground = CSF.VecInt()  
-            non_ground = CSF.VecInt()
-            csf.do_filtering(ground, non_ground) 
-            self._g_geometry = e_geometry.select_by_index(ground)
-            self._ng_geometry = e_geometry.select_by_index(non_ground)
-            # 
-            self._scene.scene.remove_geometry(AppWindow.GROUND)
-            self._scene.scene.remove_geometry(AppWindow.GROUND_BOUND)
-            self._scene.scene.add_geometry(
-                AppWindow.GROUND, self._g_geometry, self.settings.material
-            )
-            self._fileedit_ground.text = "({0} điểm)".format(len(self._g_geometry.points))
-            g_bounds = self._g_geometry.get_axis_aligned_bounding_box()
-            g_bounds.color = (1, 0, 0)
-            self._scene.scene.add_geometry(AppWindow.GROUND_BOUND, g_bounds, self.settings.material)
-            self._scene.scene.show_geometry(AppWindow.GROUND, self._checkeds[4])
-            self._scene.scene.show_geometry(AppWindow.GROUND_BOUND, self._checkeds[4])
-            # 
-            self._scene.scene.remove_geometry(AppWindow.NON_GROUND)
-            self._scene.scene.remove_geometry(AppWindow.NON_GROUND_BOUND)
-            self._scene.scene.add_geometry(
-                AppWindow.NON_GROUND, self._ng_geometry, self.settings.material
-            )
-            self._fileedit_non_ground.text = "({0} điểm)".format(len(self._ng_geometry.points))
-            ng_bounds = self._ng_geometry.get_axis_aligned_bounding_box()
-            ng_bounds.color = (1, 0, 0)
-            self._scene.scene.add_geometry(AppWindow.NON_GROUND_BOUND, ng_bounds, self.settings.material)
-            self._scene.scene.show_geometry(AppWindow.NON_GROUND, self._checkeds[5])
-            self._scene.scene.show_geometry(AppWindow.NON_GROUND_BOUND, self._checkeds[5])
+            params = self._get_csf_params()
+            self._tasks.submit("Tính địa hình", ["ground", "non_ground"],
+                               lambda task: self._csf_filter(task, e_geometry, params),
+                               lambda layers: self._apply_step("csf", layers, params), cancellable=False)
+
+    def _csf_filter(self, task, e_geometry, params):
+        """Ground and non ground points of e_geometry; runs on a worker thread."""
+        csf = CSF.CSF()
+        # prameter settings
+        csf.params.bSloopSmooth = params["slope_processing"]
+        csf.params.cloth_resolution = params["cloth_resolution"]
+        csf.params.rigidness = int(np.flatnonzero(params["rigidness"])[0] + 1)
+        csf.params.class_threshold = params["classification_threshold"]
+        csf.params.interations = int(params["max_interations"])
+        task.report(0.0, "chuẩn bị")
+        points = e_geometry.points
+        csf.setPointCloud(points)
+        del points
+        task.report(0.1, "lọc điểm mặt đất")
+        ground = CSF.VecInt()  
+        non_ground = CSF.VecInt()
+        csf.do_filtering(ground, non_ground) 
+        task.report(0.9, "thống kê")
+        layers = {"ground": e_geometry.subset(np.asarray(ground)),
+                  "non_ground": e_geometry.subset(np.asarray(non_ground))}
+        for points in layers.values():
+            points.stats
+        return layers
+
+    def _get_csf_params(self):
+        return {
+            "slope_processing": self._slope_processing,
+            "cloth_resolution": self._cloth_resolution,
+            "max_interations": self._max_interations,
+            "classification_threshold": self._classification_threshold,
+            "rigidness": self._rigidness.tolist(),
+        }
+
+    def _set_csf_params(self, params):
+        self._slope_processing = params["slope_processing"]
+        self._cloth_resolution = params["cloth_resolution"]
+        self._max_interations = params["max_interations"]
+        self._classification_threshold = params["classification_threshold"]
+        self._rigidness = np.array(params["rigidness"])
 
     def _on_menu_downsampling(self):
         em = self.window.theme.font_size
@@ -919,36 +966,30 @@ class AppWindow:
 
     def _on_aply_downsamling(self):
         self.window.close_dialog()
-        if self._geometry is not None:
+        source = self._layers["source"].points
+        if source is not None:
             if self._downsampling == 0.0:
-                self._d_geometry = None
-                self._fileedit_downsample.text = ""
-                self._scene.scene.remove_geometry(AppWindow.DOWNSAMPLE)
-                self._scene.scene.remove_geometry(AppWindow.DOWNSAMPLE_BOUND)
+                self._tasks.cancel(["downsample"])
+                self._apply_step("downsample", {"downsample": None})
                 
             else:
-                self._scene.scene.remove_geometry(AppWindow.DOWNSAMPLE)
-                self._scene.scene.remove_geometry(AppWindow.DOWNSAMPLE_BOUND)
-
-                self._d_geometry = self._geometry.voxel_down_sample(
-                    voxel_size=self._downsampling
-                )
-                bounds = self._d_geometry.get_axis_aligned_bounding_box()
-                bounds.color = (1, 0, 0)
-                oriented = self._d_geometry.get_oriented_bounding_box()
-                oriented.color = (0, 1, 0)
-               
-                self._fileedit_downsample.text = "({0} điểm)".format(
-                    len(self._d_geometry.points)
-                )
-                self._scene.scene.add_geometry(
-                    AppWindow.DOWNSAMPLE, self._d_geometry, self.settings.material
-                )
-                self._scene.scene.add_geometry(
-                    AppWindow.DOWNSAMPLE_BOUND, bounds, self.settings.material
-                )
-                self._scene.scene.show_geometry(AppWindow.DOWNSAMPLE, self._checkeds[1])
-                self._scene.scene.show_geometry(AppWindow.DOWNSAMPLE_BOUND, self._checkeds[1])
+                voxel_size = self._downsampling
+                self._tasks.submit(
+                    "Giảm mật độ PointCloud", ["downsample"],
+                    lambda task: self._downsample(task, source, voxel_size),
+                    lambda d_geometry: self._apply_step(
+                        "downsample", {"downsample": d_geometry}, {"voxel_size": voxel_size}),
+                    cancellable=False)
+
+    def _downsample(self, task, source, voxel_size):
+        """Voxel downsample of source; runs on a worker thread."""
+        task.report(0.0, "lọc voxel")
+        d_geometry = PointLayer(source.get_geometry().voxel_down_sample(
+            voxel_size=voxel_size
+        ))
+        task.report(0.9, "thống kê")
+        d_geometry.stats
+        return d_geometry
 
     def _on_doubleedit_value_change(self, value):
         print(value)
@@ -986,65 +1027,159 @@ class AppWindow:
     def _on_about_ok(self):
         self.window.close_dialog()
 
-    def _load_gui_on_main_thread(self):
-        if self._geometry is not None:
-            try:
-                self._scene.scene.remove_geometry(AppWindow.SOURCE)
-                self._scene.scene.remove_geometry(AppWindow.SOURCE_BOUND)
-                self._scene.scene.add_geometry(
-                    AppWindow.SOURCE, self._geometry, self.settings.material
-                )
-                self._fileedit_main.text = "({0} điểm)".format(
-                    len(self._geometry.points)
-                )
-                bounds = self._geometry.get_axis_aligned_bounding_box()
-                bounds.color = (1, 0, 0)
-                self._scene.scene.add_geometry(
-                    AppWindow.SOURCE_BOUND, bounds, self.settings.material
-                )
-                self._scene.scene.show_geometry(AppWindow.SOURCE, self._checkeds[0])
-                self._scene.scene.show_geometry(AppWindow.SOURCE_BOUND, self._checkeds[0])
-                
-                self._scene.setup_camera(60, bounds, bounds.get_center())
+    def _read_las(self, task, path, preview=True):
+        """Points of a LAS file as a layer, with its las header and offset; runs on a worker thread.
+
+        Uncompressed files are memory mapped and read by chunks, with a
+        sample spread over the file posted as a preview first if preview.
+        """
+        pynt_cloud = None
+        try:
+            if preview:
+                task.report(0.0, "xem trước")
+                sample, las, is_valid = PyntCloud.from_file_las(
+                    path, np.inf, offset="center", backend="memmap", sample=AppWindow.PREVIEW_POINTS)
+                if len(sample.points) == sample.las_header.point_count:
+                    # small enough to be read whole as the sample
+                    pynt_cloud = sample
+                else:
+                    points = PointLayer(sample.to_instance("open3d", mesh=False, normalize_colors=True))
+                    points.stats
+                    task.post(lambda: self._on_source_preview(points))
+                    del sample
+            if pynt_cloud is None:
+                pynt_cloud, las, is_valid = PyntCloud.from_file_las(
+                    path, np.inf, offset="center", backend="memmap", chunk_size=AppWindow.CHUNK_SIZE,
+                    on_chunk=lambda done, total: task.report(0.05 + 0.35 * done / total, "đọc file"))
+        except ValueError as e:
+            # compressed, read whole by pylas
+            print(e)
+            task.report(0.0, "đọc file")
+            pynt_cloud, las, is_valid = PyntCloud.from_file_las(path, np.inf, offset="center")
+        task.report(0.4, "chuyển đổi")
+        cloud = pynt_cloud.to_instance("open3d", mesh=False, normalize_colors=True)
+        task.report(0.5, "tính pháp tuyến")
+        if not cloud.has_normals():
+            cloud.estimate_normals()
+        cloud.normalize_normals()
+        source = PointLayer(cloud)
+        # bounds and counts, off the main thread
+        task.report(0.8, "thống kê")
+        source.stats
+        return source, las, pynt_cloud.offset
+
+    def _read_source(self, task, path):
+        """Read the points of a LAS file and start its session; runs on a worker thread."""
+        source, las, offset = self._read_las(task, path)
+        try:
+            # an existing session of the file is resumed, with its layers
+            session = Session.for_source(path)
+        except Exception as e:
+            print(e)
+            session = None
+        geometries = {"source": source} if session is None else self._restore_layers(task, session, source)
+        return geometries, las, offset, session
+
+    def _on_source_preview(self, preview):
+        """Show a sample of the source, the camera can be set while the rest is read."""
+        self._scene.scene.add_geometry(AppWindow.PREVIEW_GEOMETRY, preview.get_geometry(), self.settings.material)
+        self._layer_labels["source"].text = "(xem trước {0} điểm)".format(len(preview))
+        bounds = preview.get_axis_aligned_bounding_box()
+        self._scene.setup_camera(60, bounds, bounds.get_center())
+
+    def _on_source_read(self, result):
+        geometries, self._infile, self._offset, self._session = result
+        print("[Info] Successfully read", self._path)
+        previewed = self._scene.scene.has_geometry(AppWindow.PREVIEW_GEOMETRY)
+        self._scene.scene.remove_geometry(AppWindow.PREVIEW_GEOMETRY)
+        self._set_session_layers(geometries)
+        if not previewed:
+            # else keep the camera the user set on the preview
+            bounds = self._layers["source"].bounds
+            self._scene.setup_camera(60, bounds, bounds.get_center())
+
+    def _on_source_read_cancelled(self):
+        self._scene.scene.remove_geometry(AppWindow.PREVIEW_GEOMETRY)
+        self._layer_labels["source"].text = ""
+
+    def _on_source_read_error(self, e):
+        print(e)
+        self._scene.scene.remove_geometry(AppWindow.PREVIEW_GEOMETRY)
+        self._layer_labels["source"].text = ""
+        print("[WARNING] Failed to read points", self._path)
+        self.window.show_message_box("Chú ý", "Không đọc được file " + self._path)
+
+    def _on_menu_open_session(self):
+        dlg = gui.FileDialog(
+            gui.FileDialog.OPEN, "Chọn phiên làm việc", self.window.theme
+        )
+        dlg.add_filter(".json", "Phiên làm việc (session.json)")
+        if WORKSPACE_DIR.exists():
+            dlg.set_path(str(WORKSPACE_DIR))
+        dlg.set_on_cancel(self._on_file_dialog_cancel)
+        dlg.set_on_done(self._on_open_session_dialog_done)
+        self.window.show_dialog(dlg)
 
-            except Exception as e:
-                print(e)
+    def _on_open_session_dialog_done(self, filename):
         self.window.close_dialog()
-
-    def _load_gui_on_separate_thread(self):
-        if self._geometry is None:
-            cloud = None
-            try:
-                print("read1")
-                pynt_cloud, las = PyntCloud.from_file_las(self._path)
-                print(pynt_cloud)
-                print(las)
-                cloud = pynt_cloud.to_instance("open3d", mesh=False)
-                self._infile = las
-                print("read2")
-                # pynt_cloud = PyntCloud.from_file(self._path)
-                # print("read2")
-                # cloud = pynt_cloud.to_instance("open3d", mesh=False)
-                # print("read3")
-                # self._infile = pylas.read(self._path)
-                # print("read4")
-                if cloud.has_colors():
-                    r_colors = np.asarray(cloud.colors)
-                    cloud.colors = o3d.utility.Vector3dVector(r_colors / 255)
-            except Exception:
-                pass
-            if cloud is not None:
-                print("[Info] Successfully read", self._path)
-                if not cloud.has_normals():
-                    cloud.estimate_normals()
-                cloud.normalize_normals()
-                self._geometry = cloud
-            else:
-                print("[WARNING] Failed to read points", self.path)
-            print("Run on separate done......")
-            gui.Application.instance.post_to_main_thread(
-                self.window, self._load_gui_on_main_thread
-            )
+        self._on_menu_close_all()
+        try:
+            self._session = Session.open(filename)
+        except Exception as e:
+            print(e)
+            self.window.show_message_box("Chú ý", "Không đọc được phiên làm việc")
+            return
+        self._path = self._session.source
+        self.window.title = self._path
+        session = self._session
+        self._tasks.submit("Đang mở phiên làm việc", [layer.name for layer in self._layers],
+                           lambda task: self._restore_session(task, session),
+                           self._on_session_restored, self._on_session_restore_error)
+
+    def _restore_session(self, task, session):
+        """Points of the source and of the layers of session; runs on a worker thread."""
+        source, las, offset = self._read_las(task, session.source, preview=False)
+        return self._restore_layers(task, session, source), offset
+
+    def _restore_layers(self, task, session, source):
+        """The source and the layers of session rebuilt from it; runs on a worker thread."""
+        geometries = {"source": source}
+        for i, (name, layer) in enumerate(session.layers.items()):
+            task.report(0.85 + 0.1 * i / len(session.layers), name)
+            parent = geometries.get(layer["parent"])
+            if parent is None:
+                continue
+            if layer["has_indices"]:
+                geometries[name] = parent.subset(session.load_indices(name))
+            elif name == "downsample":
+                geometries[name] = PointLayer(
+                    parent.get_geometry().voxel_down_sample(voxel_size=layer["params"]["voxel_size"]))
+        task.report(0.95, "thống kê")
+        for points in geometries.values():
+            points.stats
+        return geometries
+
+    def _on_session_restored(self, result):
+        geometries, self._offset = result
+        self._set_session_layers(geometries)
+        bounds = self._layers["source"].bounds
+        self._scene.setup_camera(60, bounds, bounds.get_center())
+
+    def _set_session_layers(self, geometries):
+        """Show the layers rebuilt by _restore_layers, with the stage parameters of the session."""
+        recorded = self._session.layers if self._session is not None else {}
+        for name, points in geometries.items():
+            params = recorded.get(name, {}).get("params", {})
+            self._set_layer(name, points, params)
+            if name == "downsample":
+                self._downsampling = params["voxel_size"]
+            elif name == "ground":
+                self._set_csf_params(params)
+
+    def _on_session_restore_error(self, e):
+        print(e)
+        self._session = None
+        self.window.show_message_box("Chú ý", "Không đọc được phiên làm việc")
 
     def _show_cropping_dialog(self):
         em = self.window.theme.font_size
@@ -1054,19 +1189,14 @@ class AppWindow:
         dlg.add_child(dlg_layout)
         self.window.show_dialog(dlg)
 
-    def _show_processing_dialog(self):
-        em = self.window.theme.font_size
-        dlg = gui.Dialog("Đang xử lý")
-        dlg_layout = gui.Vert(em, gui.Margins(em, em, em, em))
-        dlg_layout.add_child(gui.Label("Đang nạp PointCloud..."))
-        dlg.add_child(dlg_layout)
-        self.window.show_dialog(dlg)
-
     def load(self, path):
         self._path = path
         self.window.title = path
-        self._show_processing_dialog()
-        gui.Application.instance.run_in_thread(self._load_gui_on_separate_thread)
+        # a new source replaces every layer
+        self._tasks.submit("Đang nạp PointCloud", [layer.name for layer in self._layers],
+                           lambda task: self._read_source(task, path),
+                           self._on_source_read, self._on_source_read_error,
+                           on_cancel=self._on_source_read_cancelled)
 
     def export_image(self, path, width, height):
         def on_image(image):
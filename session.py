@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+from pyntcloud.io.pcol import read_pcol, write_pcol
+
+WORKSPACE_DIR = pathlib.Path(sys.argv[0]).resolve().parent / "workspace"
+SESSION_FILE = "session.json"
+SESSION_SUFFIX = ".session"
+
+
+class Session:
+    """Working state of one source file, kept in workspace/<name>-<hash>.session/
+
+    session.json holds the source path and, per derived layer, its parent
+    layer and stage parameters. The points themselves are not copied: the
+    source is read again from its file, and a derived layer only stores the
+    indices of its points in the parent layer (<layer>.pcol), so reopening
+    is a gather instead of running every stage again. Each layer is written
+    when it changes.
+    """
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+        self.source = None
+        self.layers = {}
+
+    @classmethod
+    def for_source(cls, source):
+        """Session of a source file: its existing one, to be resumed, or a new one."""
+        source = pathlib.Path(source).resolve()
+        # files with the same name in different folders get their own session
+        key = hashlib.sha1(str(source).encode("utf-8")).hexdigest()[:8]
+        directory = WORKSPACE_DIR / "{}-{}{}".format(source.stem, key, SESSION_SUFFIX)
+        if (directory / SESSION_FILE).exists():
+            return cls.open(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        session = cls(directory)
+        session.source = str(source)
+        session._write()
+        return session
+
+    @classmethod
+    def open(cls, path):
+        """Open a session from its directory or its session.json."""
+        path = pathlib.Path(path)
+        if path.name == SESSION_FILE:
+            path = path.parent
+        with open(path / SESSION_FILE, encoding="utf-8") as f:
+            header = json.load(f)
+        session = cls(path)
+        session.source = header["source"]
+        session.layers = header["layers"]
+        return session
+
+    def _write(self):
+        header = {"source": self.source, "layers": self.layers}
+        tmp = self.directory / (SESSION_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(header, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.directory / SESSION_FILE)
+
+    def _layer_path(self, name):
+        return str(self.directory / (name + ".pcol"))
+
+    def resolve(self, parent, indices):
+        """Same points, relative to the closest ancestor that is not an index layer.
+
+        Returns None if parent is not recorded in the session.
+        """
+        indices = np.asarray(indices)
+        while parent in self.layers and self.layers[parent]["has_indices"]:
+            indices = self.load_indices(parent)[indices]
+            parent = self.layers[parent]["parent"]
+        if parent != "source" and parent not in self.layers:
+            return None
+        return parent, indices
+
+    def save_layer(self, name, parent, params=None):
+        """Record a layer rebuilt from its parent with the stage parameters."""
+        self.remove_layer(name)
+        self.layers[name] = {"parent": parent, "params": params or {}, "has_indices": False}
+        self._write()
+
+    def save_layers(self, parent, layers, params=None):
+        """Record layers computed together from parent as index arrays.
+
+        Parameters
+        ----------
+        parent: str
+            Layer they were computed from.
+        layers: dict
+            Map each layer name to the positions of its points in parent.
+        params: dict, optional
+            Stage parameters.
+        """
+        # resolve everything first: parent may be one of the replaced layers
+        resolved = {name: self.resolve(parent, indices) for name, indices in layers.items()}
+        for name in layers:
+            self.remove_layer(name)
+        for name, layer in resolved.items():
+            if layer is None:
+                continue
+            write_pcol(self._layer_path(name), indices=pd.DataFrame({"index": layer[1].astype(np.uint32)}))
+            self.layers[name] = {"parent": layer[0], "params": params or {}, "has_indices": True}
+        self._write()
+
+    def remove_layer(self, name):
+        """Forget a layer and every layer computed from it."""
+        if name not in self.layers:
+            return
+        del self.layers[name]
+        shutil.rmtree(self._layer_path(name), ignore_errors=True)
+        for child in [child for child, layer in self.layers.items() if layer["parent"] == name]:
+            self.remove_layer(child)
+        self._write()
+
+    def load_indices(self, name):
+        return read_pcol(self._layer_path(name))["indices"]["index"].values
+
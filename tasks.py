@@ -0,0 +1,215 @@
+import queue
+import threading
+import time
+
+
+class TaskCancelled(Exception):
+    """Raised in a task by Task.check once it has been cancelled."""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+
+class Task:
+    """Job of a TaskScheduler, passed to the function it runs.
+
+    The function reports its progress and checks for cancellation between
+    chunks of work. It runs on a worker thread and must not touch the GUI:
+    its result is handed to on_done on the main thread.
+    """
+
+    def __init__(self, scheduler, label, keys, cancellable=True, on_cancel=None):
+        self.label = label
+        self.keys = keys
+        self.cancellable = cancellable
+        self.on_cancel = on_cancel
+        self.token = CancelToken()
+        self.progress = 0.0
+        self.text = ""
+        self._scheduler = scheduler
+        self._reported_at = 0.0
+
+    def check(self):
+        if self.token.cancelled:
+            raise TaskCancelled()
+
+    def report(self, progress, text=None):
+        """Set the progress, in [0, 1], and the current stage; raises TaskCancelled."""
+        self.check()
+        self.progress = progress
+        if text is not None:
+            self.text = text
+        now = time.monotonic()
+        if now - self._reported_at >= self._scheduler.report_interval:
+            self._reported_at = now
+            self._scheduler._post(self._scheduler._changed)
+
+    def post(self, callback):
+        """Run callback on the main thread, e.g. to show a partial result, unless cancelled by then."""
+        self._scheduler._post(lambda: None if self.token.cancelled else callback())
+
+    def chunks(self, n, chunk_size, start=0.0, stop=1.0, text=None):
+        """Split range(n) in (begin, end) chunks, reporting progress from start to stop."""
+        for begin in range(0, n, chunk_size):
+            self.report(start + (stop - start) * begin / n, text)
+            yield begin, min(begin + chunk_size, n)
+
+
+class TaskScheduler:
+    """Runs heavy work on a pool of worker threads.
+
+    A task is submitted with the keys (layer names, ...) it writes, and
+    submitting it cancels the active tasks writing any of them: a key has
+    one active job, and a stale result never replaces a newer one. Tasks
+    submitted with wait queue up behind the earlier ones on their keys
+    instead, e.g. writes that must land in order. Results,
+    errors and progress are delivered on the main thread through post,
+    e.g. gui.Application.post_to_main_thread; a cancelled task only gets
+    its on_cancel, e.g. to remove what it posted.
+    """
+
+    # seconds between two progress updates of a task
+    report_interval = 0.1
+
+    def __init__(self, post, on_error, max_workers=2, on_changed=None):
+        """
+        Parameters
+        ----------
+        post: callable
+            post(callback) runs callback on the main thread.
+        on_error: callable
+            Called on the main thread as on_error(task, exception) for the
+            tasks submitted without their own on_error, e.g. to show it in
+            the window.
+        max_workers: int, optional
+        on_changed: callable, optional
+            Called on the main thread with the active tasks when one is
+            submitted, makes progress or ends.
+        """
+        self._post = post
+        self.on_error = on_error
+        self._queue = queue.Queue()
+        # active tasks, only used on the main thread
+        self.tasks = []
+        # tasks whose fn has not returned yet, cancelled ones included, in
+        # submission order; and the jobs of the wait tasks not queued yet
+        self._pending = []
+        self._waiting = []
+        self.on_changed = on_changed
+        for _ in range(max_workers):
+            # daemon: a running stage can't be interrupted and must not block exit
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def submit(self, label, keys, fn, on_done, on_error=None, cancellable=True, on_cancel=None, wait=False):
+        """Run fn(task) on a worker thread.
+
+        Parameters
+        ----------
+        label: str
+        keys: list of str
+            What the result of the task replaces.
+        fn: callable
+            fn(task) returns the result, given to on_done(result).
+        on_done: callable
+        on_error: callable, optional
+            Called with the exception raised by fn. Default: None, the
+            on_error of the scheduler.
+        cancellable: bool, optional
+            Default: True
+            False if fn runs as one call that can't check for cancellation:
+            the task can only be replaced by a newer one, not cancelled by
+            the user.
+        on_cancel: callable, optional
+            Called without arguments when the task is cancelled, instead
+            of on_done or on_error.
+        wait: bool, optional
+            Default: False
+            Start once every earlier task writing any of keys has returned,
+            instead of cancelling them.
+
+        Returns
+        -------
+        task: Task
+        """
+        if not wait:
+            self.cancel(keys)
+        task = Task(self, label, tuple(keys), cancellable, on_cancel)
+        self.tasks.append(task)
+        self._pending.append(task)
+        job = (task, fn, on_done, on_error)
+        if wait:
+            self._waiting.append(job)
+            self._release()
+        else:
+            self._queue.put(job)
+        self._changed()
+        return task
+
+    def cancel(self, keys=None):
+        """Cancel the active tasks writing any of keys, or all of them."""
+        self.cancel_tasks([task for task in self.tasks if keys is None or set(task.keys) & set(keys)])
+
+    def cancel_tasks(self, tasks):
+        """Cancel the given tasks, if still active."""
+        cancelled = [task for task in self.tasks if task in tasks]
+        for task in cancelled:
+            task.token.cancel()
+            self.tasks.remove(task)
+        if cancelled:
+            self._changed()
+        for task in cancelled:
+            if task.on_cancel is not None:
+                task.on_cancel()
+
+    def _release(self):
+        """Queue the waiting jobs that no earlier pending task shares a key with."""
+        for job in list(self._waiting):
+            task = job[0]
+            if task.token.cancelled:
+                self._waiting.remove(job)
+                self._pending.remove(task)
+                continue
+            earlier = self._pending[:self._pending.index(task)]
+            if not any(set(other.keys) & set(task.keys) for other in earlier):
+                self._waiting.remove(job)
+                self._queue.put(job)
+
+    def _returned(self, task):
+        self._pending.remove(task)
+        self._release()
+
+    def _work(self):
+        while True:
+            task, fn, on_done, on_error = self._queue.get()
+            try:
+                task.check()
+                result = fn(task)
+                task.check()
+            except TaskCancelled:
+                pass
+            except Exception as e:
+                callback = on_error or (lambda e, task=task: self.on_error(task, e))
+                self._post(lambda task=task, e=e, callback=callback: self._finish(task, callback, e))
+            else:
+                self._post(lambda task=task, result=result: self._finish(task, on_done, result))
+            self._post(lambda task=task: self._returned(task))
+
+    def _finish(self, task, callback, value):
+        if task.token.cancelled:
+            return
+        self.tasks.remove(task)
+        self._changed()
+        callback(value)
+
+    def _changed(self):
+        if self.on_changed is not None:
+            self.on_changed(list(self.tasks))